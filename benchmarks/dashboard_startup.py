@@ -0,0 +1,106 @@
+"""Measure cold start and first render of every dashboard page against a time budget, fully offline.
+
+Each page runs in a fresh interpreter through streamlit's AppTest, on synthetic artifacts:
+
+    python -m benchmarks.dashboard_startup --budget 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks import synthetic
+from utils.context import Context, set_context
+from utils.storage import LocalStorage
+
+DASHBOARD_DIR = os.path.abspath("dashboard")
+PAGES = [
+    "Trentino_Tourism_Forecast.py",
+    os.path.join("pages", "1_season_per_region.py"),
+    os.path.join("pages", "2_Monthly_Insights.py"),
+    os.path.join("pages", "3_Region_Map.py"),
+]
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+# Runs inside the fresh interpreter, from the dashboard directory like `streamlit run` does.
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.run()
+first = time.perf_counter()
+at.run()
+rerun = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "first_render_s": first - imported,
+    "rerun_s": rerun - first,
+    "boto3_loaded": "boto3" in sys.modules,
+    "errors": [str(e.value) for e in at.exception],
+}))
+"""
+
+
+def prepare_artifacts(workdir, scale):
+    """Synthetic predictions and the insight cubes preprocess writes, in a file:// bucket."""
+    from etl.preprocess import preprocess
+    storage = LocalStorage(os.path.join(workdir, "bucket"))
+    set_context(Context(bucket=storage.uri))
+    predictions = synthetic.generate_predictions(scale)
+    storage.write_bytes("predictions.csv", predictions.to_csv(index=False))
+    synthetic.populate_bucket(storage, scale)
+    preprocess()
+    return storage, {
+        "MONTH_CUBE_PATH": f"{storage.uri}/region_month_cube.parquet",
+        "SEASON_CUBE_PATH": f"{storage.uri}/region_season_cube.parquet",
+    }
+
+
+def measure(page, storage, paths):
+    env = dict(os.environ, TOURISM_BUCKET=storage.uri, FORECAST_CSV_PATH="predictions.csv", **paths)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", CHILD, page], cwd=DASHBOARD_DIR, env=env,
+                          capture_output=True, text=True)
+    cold = time.perf_counter() - start
+    if proc.returncode:
+        raise RuntimeError(f"{page} failed to start:\n{proc.stderr}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result.update(page=page, cold_start_s=cold)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--budget", type=float, default=3.0, help="allowed cold start per page, in seconds")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        storage, paths = prepare_artifacts(workdir, synthetic.make_scale(args.scale))
+        for page in PAGES:
+            result = measure(page, storage, paths)
+            result["over_budget"] = result["cold_start_s"] > args.budget
+            print(f"{page:<40} cold={result['cold_start_s']:.2f}s import={result['import_s']:.2f}s "
+                  f"first_render={result['first_render_s']:.2f}s rerun={result['rerun_s']:.3f}s"
+                  f"{' boto3' if result['boto3_loaded'] else ''}"
+                  f"{' OVER BUDGET' if result['over_budget'] else ''}")
+            for error in result["errors"]:
+                print(f"  error: {error}")
+            results.append(result)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(RESULTS_DIR, f"dashboard_startup_{datetime.now():%Y%m%d_%H%M%S}.json"), "w") as f:
+        json.dump({"budget_s": args.budget, "scale": args.scale, "results": results}, f, indent=2)
+    if any(r["over_budget"] or r["errors"] for r in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Compare the pandas and duckdb engines of the GTFS stage: wall time, peak memory and identical results.
+
+Each engine processes the same synthetic feed in a fresh interpreter, so peak RSS is its own:
+
+    python -m benchmarks.gtfs_engines --scales 1 10 --memory-limit 512MB
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks import synthetic
+
+ENGINES = ["pandas", "duckdb"]
+RESULTS_DIR = os.path.join("benchmarks", "results")
+OUTPUTS = ["trip_months", "daily_trips", "departures"]
+
+# Runs inside the fresh interpreter; writes the feed's outputs next to the feed for comparison.
+CHILD = """
+import json, os, resource, sys, time
+from utils.gtfs_utils import Feed, feed_date_range
+from etl.gtfs_etl import process_feed
+feed_dir, geo_path, engine, out_dir = sys.argv[1:5]
+start = time.perf_counter()
+feed = Feed("default", feed_dir, feed_date_range(feed_dir))
+trip_months, daily_trips, _, departures = process_feed(feed, geo_path, engine)
+wall = time.perf_counter() - start
+trip_months.to_pickle(os.path.join(out_dir, "trip_months.pkl"))
+daily_trips.to_pickle(os.path.join(out_dir, "daily_trips.pkl"))
+departures.to_pickle(os.path.join(out_dir, "departures.pkl"))
+# ru_maxrss is in kilobytes on Linux.
+print(json.dumps({"wall_s": wall, "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+
+def run_engine(engine, feed_dir, geo_path, out_dir, memory_limit):
+    os.makedirs(out_dir, exist_ok=True)
+    env = dict(os.environ, GTFS_ENGINE=engine)
+    if memory_limit:
+        env["DUCKDB_MEMORY_LIMIT"] = memory_limit
+    proc = subprocess.run([sys.executable, "-c", CHILD, feed_dir, geo_path, engine, out_dir],
+                          env=env, capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(f"{engine} engine failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def canonical(df):
+    df = df.astype({col: str for col in df.columns if df[col].dtype == object or col in ("trip_id", "date")})
+    return df.sort_values(list(df.columns), ignore_index=True)
+
+
+def compare(out_dirs):
+    """Names of the outputs that differ between the engines."""
+    reference, *others = out_dirs
+    differing = []
+    for name in OUTPUTS:
+        expected = canonical(pd.read_pickle(os.path.join(reference, f"{name}.pkl")))
+        for other in others:
+            actual = canonical(pd.read_pickle(os.path.join(other, f"{name}.pkl")))
+            try:
+                pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+            except AssertionError:
+                differing.append(name)
+    return differing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1])
+    parser.add_argument("--memory-limit", help="DUCKDB_MEMORY_LIMIT for the duckdb engine, e.g. 512MB")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for factor in args.scales:
+            feed_dir, geo_path = synthetic.generate_gtfs_feed(
+                os.path.join(workdir, f"gtfs_{factor}"), synthetic.make_scale(factor))
+            out_dirs = [os.path.join(workdir, f"out_{factor}_{engine}") for engine in ENGINES]
+            for engine, out_dir in zip(ENGINES, out_dirs):
+                result = run_engine(engine, feed_dir, geo_path, out_dir, args.memory_limit)
+                result.update(engine=engine, scale=factor)
+                print(f"scale={factor:<4} {engine:<7} wall={result['wall_s']:.2f}s peak_rss={result['peak_rss_mb']:.0f}MB")
+                results.append(result)
+            differing = compare(out_dirs)
+            print(f"scale={factor:<4} results {'differ: ' + ', '.join(differing) if differing else 'identical'}")
+            for result in results[-len(ENGINES):]:
+                result["differing"] = differing
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(RESULTS_DIR, f"gtfs_engines_{datetime.now():%Y%m%d_%H%M%S}.json"), "w") as f:
+        json.dump({"memory_limit": args.memory_limit, "results": results}, f, indent=2)
+    if any(r["differing"] for r in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Load test for src/serve.py: concurrent clients, p50/p99 latency and throughput.
+
+    python -m src.serve &
+    python -m benchmarks.load_test_service --requests 5000 --concurrency 32
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def make_queries(regions, n, repeat_ratio, seed=42):
+    """Random region/week/weather queries; `repeat_ratio` of them reuse an earlier query to exercise the cache."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n):
+        if queries and rng.random() < repeat_ratio:
+            queries.append(rng.choice(queries))
+            continue
+        query = {"region": rng.choice(regions), "year": 2025, "week": rng.randint(1, 52)}
+        if rng.random() < 0.5:
+            query["temperature_2m_mean"] = round(rng.uniform(-10, 30), 1)
+            query["snowfall_sum"] = round(rng.uniform(0, 5), 2)
+        queries.append(query)
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--repeat-ratio", type=float, default=0.3)
+    args = parser.parse_args()
+
+    with urlopen(f"{args.url}/regions") as response:
+        regions = json.load(response)
+    queries = make_queries(regions, args.requests, args.repeat_ratio)
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def call(query):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            with urlopen(f"{args.url}/predict?{urlencode(query)}") as response:
+                response.read()
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(call, queries))
+    wall = time.perf_counter() - start
+
+    with urlopen(f"{args.url}/health") as response:
+        health = json.load(response)
+
+    print(f"requests:    {len(queries)} ({errors} errors) with {args.concurrency} clients")
+    print(f"throughput:  {len(latencies) / wall:.1f} req/s")
+    if latencies:
+        print(f"latency p50: {percentile(latencies, 50) * 1000:.2f} ms")
+        print(f"latency p99: {percentile(latencies, 99) * 1000:.2f} ms")
+        print(f"latency avg: {statistics.mean(latencies) * 1000:.2f} ms")
+    print(f"cache hits:  features {health['feature_cache_hits']}, results {health['result_cache_hits']}")
+
+
+if __name__ == "__main__":
+    main()
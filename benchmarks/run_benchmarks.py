@@ -0,0 +1,188 @@
+"""Time pipeline stages on synthetic data at several scales, fully offline.
+
+    python -m benchmarks.run_benchmarks --scales 1 10 --save-baseline
+    python -m benchmarks.run_benchmarks --scales 1 10 --compare
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+
+from benchmarks import synthetic
+from utils.context import Context, set_context
+from utils.storage import LocalStorage
+
+RESULTS_DIR = os.path.join("benchmarks", "results")
+BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+
+
+def timed(func, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return result, timings
+
+
+def bench_gtfs(scale, workdir, storage, repeat):
+    from etl.gtfs_etl import load_gtfs_data, process_gtfs_data
+    feed_dir, geo_path = synthetic.generate_gtfs_feed(os.path.join(workdir, "gtfs"), scale)
+    data = load_gtfs_data(feed_dir, geo_path)
+    (monthly_trips, _, _), timings = timed(lambda: process_gtfs_data(data), repeat)
+    return len(data["stop_times"]), timings
+
+
+def bench_gtfs_departures(scale, workdir, storage, repeat):
+    from etl.gtfs_etl import load_gtfs_data, locate_stops, feed_departures
+    feed_dir, geo_path = synthetic.generate_gtfs_feed(os.path.join(workdir, "gtfs"), scale)
+    data = load_gtfs_data(feed_dir, geo_path)
+    stops_with_regions, _ = locate_stops(data)
+    _, timings = timed(lambda: feed_departures(data, stops_with_regions), repeat)
+    return len(data["stop_times"]), timings
+
+
+def bench_tourism_transform(scale, workdir, storage, repeat):
+    from etl.tourism_etl import transform
+    years = range(synthetic.FIRST_YEAR, synthetic.FIRST_YEAR + synthetic.BASE_YEARS * scale.years)
+    pages = {year: synthetic.generate_statweb_html(year, scale) for year in years}
+
+    def run():
+        rows = 0
+        for year, html in pages.items():
+            table = BeautifulSoup(html, "html.parser").find("table").find_all("table")[2]
+            rows += len(transform(table, year))
+        return rows
+
+    return timed(run, repeat)
+
+
+def bench_merge_weather_tourism(scale, workdir, storage, repeat):
+    from utils.preprocess_utils import merge_weather_tourism
+    synthetic.populate_bucket(storage, scale)
+    df, timings = timed(lambda: merge_weather_tourism("tourism_movement_with_gtfs.csv", storage.uri), repeat)
+    return len(df), timings
+
+
+def bench_preprocess(scale, workdir, storage, repeat):
+    from etl.preprocess import preprocess
+    synthetic.populate_bucket(storage, scale)
+    _, timings = timed(preprocess, repeat)
+    rows = storage.read_bytes("preprocessed.csv").count(b"\n") - 1
+    return rows, timings
+
+
+def bench_dashboard_predictions(scale, workdir, storage, repeat):
+    from dashboard.utils.loaders import load_predictions
+    predictions = synthetic.generate_predictions(scale)
+    storage.write_bytes("predictions.csv", predictions.to_csv(index=False))
+    df, timings = timed(lambda: load_predictions(storage.uri, "predictions.csv"), repeat)
+    return len(df), timings
+
+
+def bench_dashboard_preprocessed(scale, workdir, storage, repeat):
+    from dashboard.utils.loaders import load_preprocessed
+    from etl.preprocess import preprocess
+    synthetic.populate_bucket(storage, scale)
+    preprocess()
+    path = storage.path("preprocessed.csv")
+    columns = ["Year", "Month_Num", "Region", "season", "tourism_index", "experience_level"]
+    df, timings = timed(lambda: load_preprocessed(path, columns), repeat)
+    return len(df), timings
+
+
+STAGES = {
+    "gtfs": bench_gtfs,
+    "gtfs_departures": bench_gtfs_departures,
+    "tourism_transform": bench_tourism_transform,
+    "merge_weather_tourism": bench_merge_weather_tourism,
+    "preprocess": bench_preprocess,
+    "dashboard_predictions": bench_dashboard_predictions,
+    "dashboard_preprocessed": bench_dashboard_preprocessed,
+}
+
+
+def run(stages, scales, repeat):
+    results = []
+    for scale in scales:
+        for name in stages:
+            with tempfile.TemporaryDirectory() as workdir:
+                # Every stage reads and writes its bucket on local disk through a file:// URI.
+                storage = LocalStorage(os.path.join(workdir, "bucket"))
+                set_context(Context(bucket=storage.uri))
+                rows, timings = STAGES[name](scale, workdir, storage, repeat)
+            result = {
+                "stage": name,
+                "scale": synthetic.scale_label(scale),
+                "rows": int(rows),
+                "best_s": min(timings),
+                "median_s": statistics.median(timings),
+            }
+            print(f"{name:<24} {result['scale']:>14} rows={result['rows']:>10} "
+                  f"best={result['best_s']:.3f}s median={result['median_s']:.3f}s")
+            results.append(result)
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Print the ratio against the baseline and return the stages slower than tolerance allows."""
+    reference = {(r["stage"], r["scale"]): r for r in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        base = reference.get((result["stage"], result["scale"]))
+        if base is None:
+            continue
+        ratio = result["best_s"] / base["best_s"] if base["best_s"] else float("inf")
+        flag = "REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{result['stage']:<24} {result['scale']:>14} {base['best_s']:.3f}s -> {result['best_s']:.3f}s "
+              f"x{ratio:.2f} {flag}")
+        if flag:
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--scales", nargs="+", type=int, default=[1, 10])
+    parser.add_argument("--regions-scale", type=int, help="override the scale of regions only")
+    parser.add_argument("--trips-scale", type=int, help="override the scale of trips only")
+    parser.add_argument("--years-scale", type=int, help="override the scale of years only")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save-baseline", action="store_true", help=f"write results to {BASELINE_PATH}")
+    parser.add_argument("--compare", action="store_true", help=f"compare against {BASELINE_PATH}")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging")
+    args = parser.parse_args()
+
+    scales = [synthetic.make_scale(factor, args.regions_scale, args.trips_scale, args.years_scale)
+              for factor in args.scales]
+    report = run(args.stages, scales, args.repeat)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d_%H%M%S}.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(BASELINE_PATH) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
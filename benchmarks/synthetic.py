@@ -0,0 +1,224 @@
+import json
+import os
+import zlib
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Base sizes at scale factor 1; every benchmark scale multiplies these.
+BASE_REGIONS = 8
+BASE_TRIPS = 300
+BASE_YEARS = 2
+STOPS_PER_TRIP = 12
+FIRST_YEAR = 2022
+
+MONTH_NAMES = ["Gennaio", "Febbraio", "Marzo", "Aprile", "Maggio", "Giugno",
+               "Luglio", "Agosto", "Settembre", "Ottobre", "Novembre", "Dicembre"]
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+Scale = namedtuple("Scale", ["regions", "trips", "years"])
+
+
+def make_scale(factor=1, regions=None, trips=None, years=None):
+    """Scale factors per dimension; unset dimensions use the global factor."""
+    return Scale(regions or factor, trips or factor, years or factor)
+
+
+def scale_label(scale):
+    if scale.regions == scale.trips == scale.years:
+        return f"{scale.regions}x"
+    return f"r{scale.regions}x-t{scale.trips}x-y{scale.years}x"
+
+
+def region_names(n):
+    return [f"Synthetic Region {i:04d}" for i in range(n)]
+
+
+def _comuni(n, map_path="utils/comune_to_region_map.json"):
+    # GTFS regions have to resolve through the real comune map, so they are capped by its size.
+    with open(map_path, "r", encoding="utf-8") as f:
+        comune_to_region = json.load(f)
+    comuni = [name for name, region in comune_to_region.items() if region]
+    return comuni[:max(1, min(n, len(comuni)))]
+
+
+def generate_gtfs_feed(out_dir, scale, seed=42):
+    """Write a GTFS feed plus a comune boundary GeoJSON and return (feed_dir, geo_path)."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+
+    comuni = _comuni(BASE_REGIONS * 2 * scale.regions)
+    grid = int(np.ceil(np.sqrt(len(comuni))))
+    cell = 0.05
+    features = []
+    for i, comune in enumerate(comuni):
+        x0, y0 = 10.5 + (i % grid) * cell, 45.8 + (i // grid) * cell
+        ring = [[x0, y0], [x0 + cell, y0], [x0 + cell, y0 + cell], [x0, y0 + cell], [x0, y0]]
+        features.append({
+            "type": "Feature",
+            "properties": {"COMUNE": comune},
+            "geometry": {"type": "Polygon", "coordinates": [ring]},
+        })
+    geo_path = os.path.join(out_dir, "comuni.geojson")
+    with open(geo_path, "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f)
+
+    n_stops = 20 * len(comuni)
+    cells = rng.integers(0, len(comuni), n_stops)
+    stops = pd.DataFrame({
+        "stop_id": np.arange(1, n_stops + 1),
+        "stop_name": [f"Stop {i}" for i in range(1, n_stops + 1)],
+        "stop_lat": 45.8 + (cells // grid) * cell + rng.uniform(0.001, cell - 0.001, n_stops),
+        "stop_lon": 10.5 + (cells % grid) * cell + rng.uniform(0.001, cell - 0.001, n_stops),
+    })
+
+    n_routes = max(1, BASE_TRIPS * scale.trips // 15)
+    routes = pd.DataFrame({
+        "route_id": np.arange(1, n_routes + 1),
+        "agency_id": 1,
+        "route_short_name": [f"R{i}" for i in range(1, n_routes + 1)],
+        "route_type": 3,
+    })
+
+    n_years = BASE_YEARS * scale.years
+    n_services = 12 * n_years
+    starts = pd.date_range(f"{FIRST_YEAR}-01-01", periods=n_services, freq="MS")
+    calendar = pd.DataFrame({"service_id": [f"S{i}" for i in range(n_services)]})
+    for day in WEEKDAYS:
+        calendar[day] = rng.integers(0, 2, n_services)
+    calendar["monday"] = 1
+    calendar["start_date"] = starts.strftime("%Y%m%d").astype(int)
+    calendar["end_date"] = (starts + pd.offsets.MonthEnd(0)).strftime("%Y%m%d").astype(int)
+
+    n_extra = max(1, n_services // 4)
+    extra_dates = pd.to_datetime(rng.choice(pd.date_range(starts[0], periods=365 * n_years), n_extra))
+    calendar_dates = pd.DataFrame({
+        "service_id": [f"X{i}" for i in range(n_extra)],
+        "date": extra_dates.strftime("%Y%m%d").astype(int),
+        "exception_type": 1,
+    })
+
+    n_trips = BASE_TRIPS * scale.trips
+    service_ids = np.concatenate([calendar["service_id"].values, calendar_dates["service_id"].values])
+    trips = pd.DataFrame({
+        "route_id": rng.integers(1, n_routes + 1, n_trips),
+        "service_id": rng.choice(service_ids, n_trips),
+        "trip_id": [f"T{i}" for i in range(n_trips)],
+        "trip_headsign": "Synthetic",
+        "direction_id": rng.integers(0, 2, n_trips),
+        "shape_id": rng.integers(1, n_routes + 1, n_trips),
+    })
+
+    first_departure = rng.integers(5 * 3600, 21 * 3600, n_trips)
+    offsets = np.arange(STOPS_PER_TRIP) * 180
+    seconds = (first_departure[:, None] + offsets[None, :]).ravel()
+    times = [f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}" for s in seconds]
+    stop_times = pd.DataFrame({
+        "trip_id": np.repeat(trips["trip_id"].values, STOPS_PER_TRIP),
+        "arrival_time": times,
+        "departure_time": times,
+        "stop_id": rng.integers(1, n_stops + 1, n_trips * STOPS_PER_TRIP),
+        "stop_sequence": np.tile(np.arange(1, STOPS_PER_TRIP + 1), n_trips),
+    })
+
+    for name, frame in [("routes", routes), ("trips", trips), ("calendar", calendar),
+                        ("calendar_dates", calendar_dates), ("stops", stops), ("stop_times", stop_times)]:
+        frame.to_csv(os.path.join(out_dir, f"{name}.txt"), index=False)
+    return out_dir, geo_path
+
+
+def generate_tourism_movement(scale, seed=42, with_trips=True):
+    """Tourism movement rows shaped like tourism_etl output (plus num_trips like gtfs_etl adds)."""
+    rng = np.random.default_rng(seed)
+    regions = region_names(BASE_REGIONS * scale.regions) + ["Provincia"]
+    years = range(FIRST_YEAR, FIRST_YEAR + BASE_YEARS * scale.years)
+    months = list(range(1, 13))
+
+    grid = pd.MultiIndex.from_product([years, months, regions], names=["Year", "Month_Num", "Region"]).to_frame(index=False)
+    seasonal = 1 + 0.8 * np.cos((grid["Month_Num"].values - 8) / 12 * 2 * np.pi)
+    grid["Month_Name"] = np.array(MONTH_NAMES)[grid["Month_Num"].values - 1]
+    grid["Italians"] = (rng.integers(5_000, 200_000, len(grid)) * seasonal).astype(int)
+    grid["Foreigners"] = (rng.integers(5_000, 200_000, len(grid)) * seasonal).astype(int)
+
+    totals = grid.groupby(["Year", "Region"], as_index=False)[["Italians", "Foreigners"]].sum()
+    totals["Month_Num"] = 0
+    totals["Month_Name"] = "Total"
+    df = pd.concat([grid, totals], ignore_index=True)
+    df = df[["Year", "Month_Num", "Month_Name", "Region", "Italians", "Foreigners"]]
+    if with_trips:
+        df["num_trips"] = rng.integers(50, 5_000, len(df)).astype(float)
+    return df
+
+
+def generate_weather(scale, seed=42, region=None):
+    """Daily Open-Meteo archive frame, same columns and order as weather_etl.fetch_weather_data."""
+    rng = np.random.default_rng(seed if region is None else seed + zlib.crc32(region.encode()) % 10_000)
+    dates = pd.date_range(f"{FIRST_YEAR}-01-01", periods=365 * BASE_YEARS * scale.years, freq="D", tz="UTC")
+    day_of_year = dates.dayofyear.values
+    temperature = 8 + 12 * np.sin((day_of_year - 110) / 365 * 2 * np.pi) + rng.normal(0, 3, len(dates))
+    rain = np.where(rng.random(len(dates)) < 0.35, rng.gamma(2, 3, len(dates)), 0.0)
+    snowfall = np.where(temperature < 1, rain * 0.7, 0.0)
+    return pd.DataFrame({
+        "date": dates,
+        "temperature_2m_mean": temperature.astype("float32"),
+        "cloud_cover_mean": rng.uniform(0, 100, len(dates)).astype("float32"),
+        "rain_sum": rain.astype("float32"),
+        "snowfall_sum": snowfall.astype("float32"),
+        "wind_speed_10m_max": rng.gamma(3, 4, len(dates)).astype("float32"),
+    })
+
+
+def generate_statweb_html(year, scale, seed=42):
+    """HTML page laid out like the statweb 'movturistico' report that tourism_etl.extract parses."""
+    rng = np.random.default_rng(seed + year)
+    regions = region_names(BASE_REGIONS * scale.regions) + ["Provincia"]
+    header = "<tr><td></td>" + "".join(f"<td>{r}</td>" for r in regions) + "</tr>"
+    subheader = "<tr><td></td>" + "<td>Italiani</td><td>Stranieri</td><td>Totale</td>" * len(regions) + "</tr>"
+
+    def fmt(value):
+        return f"{value:,}".replace(",", ".")
+
+    rows = []
+    for label in MONTH_NAMES + ["Anno"]:
+        cells = []
+        for _ in regions:
+            italians, foreigners = rng.integers(1_000, 500_000, 2)
+            cells += [fmt(italians), fmt(foreigners), fmt(italians + foreigners)]
+        rows.append(f"<tr><td>\r\n{label}</td>" + "".join(f"<td>{c}</td>" for c in cells) + "</tr>")
+    data_table = "<table>" + header + subheader + "".join(rows) + "</table>"
+    return ("<html><body><table><tr><td>"
+            "<table><tr><td>Movimento turistico</td></tr></table>"
+            "<table><tr><td>Arrivi e presenze</td></tr></table>"
+            f"{data_table}</td></tr></table></body></html>")
+
+
+def populate_bucket(storage, scale, seed=42):
+    """Write the tourism and per-region weather inputs preprocess reads from the bucket."""
+    tourism = generate_tourism_movement(scale, seed=seed)
+    storage.write_bytes("tourism_movement_with_gtfs.csv", tourism.to_csv(index=False))
+    storage.write_bytes("tourism_movement.csv", tourism.drop(columns=["num_trips"]).to_csv(index=False))
+    for region in tourism["Region"].unique():
+        if region.lower() != "provincia":
+            weather = generate_weather(scale, seed=seed, region=region)
+            storage.write_bytes(f"weather_data_{region}.csv", weather.to_csv(index=False))
+    return tourism
+
+
+def generate_predictions(scale, weeks=104, seed=42):
+    """Weekly forecast rows in the layout the dashboard expects from predictions.csv."""
+    rng = np.random.default_rng(seed)
+    regions = region_names(BASE_REGIONS * scale.regions)
+    mondays = pd.date_range(f"{FIRST_YEAR}-01-03", periods=weeks * scale.years, freq="W-MON")
+    iso = mondays.isocalendar()
+    df = pd.DataFrame({
+        "year": np.repeat(iso["year"].values, len(regions)),
+        "week": np.repeat(iso["week"].values, len(regions)),
+        "Region": np.tile(regions, len(mondays)),
+    })
+    df["tourism_index"] = rng.random(len(df)).round(4)
+    df["experience_level"] = pd.cut(
+        df["tourism_index"], [-np.inf, 0.1, 0.4, 0.6, 0.75, np.inf],
+        labels=["Not Ideal", "Quiet Season", "Moderate Season", "Popular Season", "Peak Season"], right=False
+    ).astype(str)
+    return df
@@ -2,7 +2,8 @@ import streamlit as st
 import pandas as pd
 import os
 import datetime
-from utils.s3_utils import read_from_s3
+from utils.loaders import lookup
+from utils import data_service
 
 # -----------------------------
 # Config
@@ -22,20 +23,14 @@ DATA_PATH = os.getenv("FORECAST_CSV_PATH", "predictions.csv")
 CURRENT_WEEK = datetime.datetime.now().isocalendar().week
 CURRENT_YEAR = datetime.datetime.now().isocalendar().year
 
-@st.cache_data
-def loading():
-    df = read_from_s3(BUCKET_NAME,DATA_PATH)
-    # Expected columns: ['year','week','Region','tourism_index','experience_level']
-    return df[["year", "week", "Region", "tourism_index", "experience_level"]]
-
-df = loading()
+df, top3, regions = data_service.predictions(BUCKET_NAME, DATA_PATH)
 
 experience_styles = {
     "Not ideal": {"color": "#f2f6fa", "emoji": "😴"},
     "Quiet season": {"color": "#f9f9f9", "emoji": "🛌"},
     "Moderate season": {"color": "#fff9e6", "emoji": "🙂"},
-    "Popular": {"color": "#e8f5e9", "emoji": "😎"},
-    "Peak": {"color": "#ffe6e6", "emoji": "🔥"},
+    "Popular season": {"color": "#e8f5e9", "emoji": "😎"},
+    "Peak season": {"color": "#ffe6e6", "emoji": "🔥"},
 }
 
 
@@ -94,7 +89,7 @@ with col1:
 with col2:
     region_choice = st.selectbox(
         "Focus on a specific region (optional):",
-        ["All regions"] + sorted(df["Region"].unique().tolist()),
+        ["All regions"] + regions,
         help="leave as 'All regions' to see top performers"
     )
 
@@ -127,32 +122,28 @@ forecast_weeks = get_forecast_weeks(CURRENT_WEEK, CURRENT_YEAR)
 # -----------------------------
 # Filter Data
 # -----------------------------
-filtered_df = df[df.apply(lambda r: (r["year"], r["week"]) in forecast_weeks, axis=1)]
-
-if region_choice != "All regions":
-    filtered_df = filtered_df[filtered_df["Region"] == region_choice]
+if region_choice == "All regions":
+    filtered = {(yr, wk): lookup(top3, (yr, wk)).reset_index() for (yr, wk) in forecast_weeks}
+else:
+    filtered = {(yr, wk): lookup(df, (yr, wk, region_choice)).reset_index() for (yr, wk) in forecast_weeks}
 
 
 
 # -----------------------------
 # Main Content
 # -----------------------------
-if filtered_df.empty:
+if all(week_df.empty for week_df in filtered.values()):
     st.warning("No forecast data available for the selected period.")
 else:
     if region_choice == "All regions":
         for (yr, wk) in forecast_weeks:
             st.markdown(f"### 🗓️ Top Regions for Week {wk}, {yr}")
 
-            week_df = (
-                filtered_df[(filtered_df["year"] == yr) & (filtered_df["week"] == wk)]
-                .sort_values("tourism_index", ascending=False)
-                .head(3)
-            )
+            week_df = filtered[(yr, wk)]
             
             cols = st.columns(3)
             for i, (_, row) in enumerate(week_df.iterrows()):
-                style = experience_styles.get(str(row["experience_level"]).capitalize())
+                style = experience_styles.get(str(row["experience_level"]).capitalize(), {"color": "#ffffff", "emoji": ""})
                 
                 bg_color = style["color"]
                 emoji = style["emoji"]
@@ -171,19 +162,12 @@ else:
     else:
         st.markdown(f"### 📍 Tourism Forecast for **{region_choice}**")
 
-        # Keep rows for the selected region and sort chronologically
-        region_df = (
-            filtered_df[filtered_df["Region"] == region_choice]
-            .sort_values(["year", "week"])
-            .reset_index(drop=True)
-        )
-
         # Create columns: 1 column per forecast week
         cols = st.columns(len(forecast_weeks))
 
         # Loop through weeks and fill each column
         for idx, (yr, wk) in enumerate(forecast_weeks):
-            sub = region_df[(region_df["year"] == yr) & (region_df["week"] == wk)]
+            sub = filtered[(yr, wk)]
 
             if sub.empty:
                 with cols[idx]:
@@ -1,6 +1,6 @@
 import streamlit as st
-import pandas as pd
 import os
+from utils import data_service
 
 # -----------------------------
 # Page Config
@@ -10,7 +10,8 @@ st.set_page_config(page_title="Monthly Insights", layout="wide")
 # -----------------------------
 # Load data
 # -----------------------------
-DATA_PATH = os.getenv("FORECAST_CSV_PATH", "data/preprocessed.csv")
+MONTH_CUBE_PATH = os.getenv("MONTH_CUBE_PATH", "data/region_month_cube.parquet")
+SEASON_CUBE_PATH = os.getenv("SEASON_CUBE_PATH", "data/region_season_cube.parquet")
 MONTH_NAMES = {
     1: "January",    2: "February",  3: "March",
     4: "April",      5: "May",       6: "June",
@@ -18,15 +19,8 @@ MONTH_NAMES = {
     10: "October",  11: "November", 12: "December"
 }
 
-@st.cache_data
-def load_forecast():
-    df = pd.read_csv(DATA_PATH)
-    region_cols=[col for col in df.columns if col.startswith("region_")]
-    df["Region"]=df[region_cols].idxmax(axis=1).str.replace("region__","")
-    df["Region"]=df["Region"].str.replace('_', " ")
-    return df[["Year", "Month_Num","Region", "season", "tourism_index", "experience_level"]]
-
-df = load_forecast()
+month_cube = data_service.cube(MONTH_CUBE_PATH, "Month_Num")
+season_cube = data_service.cube(SEASON_CUBE_PATH, "season")
 
 def categorize_experience(score):
     if score < 0.1:
@@ -66,7 +60,7 @@ with st.container():
     with col1:
         region_choice = st.selectbox(
         "Region:",
-        ["All regions"] + sorted(df["Region"].unique().tolist()),
+        ["All regions"] + sorted(month_cube["Region"].unique().tolist()),
         help="Select the region for which you want to see tourism insights."
     )
     
@@ -82,7 +76,8 @@ with st.container():
 
 
 
-filtered_df = df[df["Region"] == region_choice]
+cube = month_cube if search_by == "Month" else season_cube
+filtered_df = cube[cube["Region"] == region_choice]
 
 if region_choice=="All regions":
     st.warning("Select a region first")
@@ -92,12 +87,7 @@ if filtered_df.empty:
     st.stop()
 
 if search_by=="Month":
-    top_month = (
-        filtered_df.groupby("Month_Num")["tourism_index"]
-        .mean()
-        .reset_index()
-    )
-    month_num=top_month[top_month["tourism_index"]==top_month["tourism_index"].max()]["Month_Num"].iloc[0]
+    month_num=filtered_df.loc[filtered_df["tourism_index_mean"].idxmax(), "Month_Num"]
     month=MONTH_NAMES[month_num]
 
 
@@ -114,12 +104,7 @@ if search_by=="Month":
 
 else:
 
-    top_season= (
-        filtered_df.groupby("season")["tourism_index"]
-        .mean()
-        .reset_index()
-    )
-    season=top_season[top_season["tourism_index"]==top_season["tourism_index"].max()]["season"].iloc[0]
+    season=filtered_df.loc[filtered_df["tourism_index_mean"].idxmax(), "season"]
    
 
 
@@ -1,6 +1,6 @@
 import streamlit as st
-import pandas as pd
 import os
+from utils import data_service
 
 # -----------------------------
 # Page Config
@@ -10,22 +10,14 @@ st.set_page_config(page_title="Monthly Insights", layout="wide")
 # -----------------------------
 # Load data
 # -----------------------------
-DATA_PATH = os.getenv("FORECAST_CSV_PATH", "data/preprocessed.csv")
+MONTH_CUBE_PATH = os.getenv("MONTH_CUBE_PATH", "data/region_month_cube.parquet")
 MONTHS = {
     "January":1,    "February":2,  "March":3,
     "April":4,      "May":5,       "June":6,
     "July":7,       "August":8,    "September":9,
     "October":10,   "November":11, "December":12
 }
-@st.cache_data
-def load_forecast():
-    df = pd.read_csv(DATA_PATH)
-    region_cols=[col for col in df.columns if col.startswith("region_")]
-    df["Region"]=df[region_cols].idxmax(axis=1).str.replace("region__","")
-    df["Region"]=df["Region"].str.replace('_', " ")
-    return df[["Year", "Month_Num","Region", "tourism_index", "experience_level"]]
-
-df = load_forecast()
+df = data_service.cube(MONTH_CUBE_PATH, "Month_Num")
 
 def categorize_experience(score):
     if score < 0.1:
@@ -93,15 +85,8 @@ if filtered_df.empty:
     st.warning("No data matches your selected filters.")
     st.stop()
 
-# Compute Top N Regions
-top_regions = (
-    filtered_df.groupby("Region")["tourism_index"]
-    .mean()
-    .nlargest(top_n)
-    .reset_index()
-)
-
-region_details = df[df["Region"].isin(top_regions["Region"])][["Region", "experience_level"]].drop_duplicates()
+# Top N Regions
+top_regions = filtered_df.nlargest(top_n, "tourism_index_mean")
 
 # -----------------------------
 # Display Cards
@@ -112,14 +97,14 @@ cols = st.columns(3)
 
 for i, (idx, row) in enumerate(top_regions.iterrows()):
     region = row["Region"]
-    level = categorize_experience(row["tourism_index"])
+    level = categorize_experience(row["tourism_index_mean"])
 
     
     with cols[i % 3]:
         st.markdown(f"""
         <div class="region-card">
-            <h3>{region.replace("_", " ")}</h3>
-            <div class="metric-value">{row['tourism_index']:.2f}</div>
+            <h3>{region}</h3>
+            <div class="metric-value">{row['tourism_index_mean']:.2f}</div>
             <div class="experience-label">{level}</div>
         </div>
         """, unsafe_allow_html=True)
@@ -0,0 +1,99 @@
+import streamlit as st
+import pydeck as pdk
+import os
+from utils import data_service
+from utils.loaders import lookup
+
+# -----------------------------
+# Page Config
+# -----------------------------
+st.set_page_config(page_title="Region Map", layout="wide")
+
+# -----------------------------
+# Load data
+# -----------------------------
+BUCKET_NAME=os.getenv("TOURISM_BUCKET")
+if not BUCKET_NAME:
+    raise RuntimeError("TOURISM_BUCKET env var not set (BUCKET_NAME is required)")
+
+DATA_PATH = os.getenv("FORECAST_CSV_PATH", "predictions.csv")
+GEO_LEVELS_KEY = os.getenv("GEO_LEVELS_KEY", "geo/regions_{level}.geojson")
+DETAIL_LEVELS = {"Coarse": "low", "Normal": "medium", "Detailed": "high"}
+
+# Fill colour from a tourism_index of 0 (pale) to 1 (deep red); grey for regions without a forecast.
+LOW_COLOR = (242, 246, 250)
+HIGH_COLOR = (198, 40, 40)
+MISSING_COLOR = [200, 200, 200, 120]
+
+df, top3, regions = data_service.predictions(BUCKET_NAME, DATA_PATH)
+
+
+def index_color(value):
+    return [round(lo + (hi - lo) * value) for lo, hi in zip(LOW_COLOR, HIGH_COLOR)] + [190]
+
+
+def colored_features(geojson, week_df):
+    """Copy of the (shared, cached) GeoJSON with each region's forecast and colour in its properties."""
+    forecast = week_df.set_index("Region")[["tourism_index", "experience_level"]].to_dict("index")
+    features = []
+    for feature in geojson["features"]:
+        region = feature["properties"]["Region"]
+        row = forecast.get(region)
+        properties = dict(feature["properties"])
+        if row is None:
+            properties.update(tourism_index="n/a", experience_level="No forecast", fill=MISSING_COLOR)
+        else:
+            properties.update(tourism_index=round(float(row["tourism_index"]), 2),
+                              experience_level=str(row["experience_level"]),
+                              fill=index_color(float(row["tourism_index"])))
+        features.append(dict(feature, properties=properties))
+    return dict(geojson, features=features)
+
+
+st.title("🗺️ Tourism Forecast Map")
+
+st.markdown("""
+See the forecast **tourism index of every region** on the map for a week.  
+Darker regions are busier; hover a region for its index and experience level.
+""")
+
+st.markdown("### 🔍 Filter Options")
+
+weeks = sorted(df.index.droplevel("Region").unique().tolist())
+if not weeks:
+    st.warning("No forecast data available.")
+    st.stop()
+
+col1, col2 = st.columns(2)
+
+with col1:
+    year_week = st.selectbox("Week", weeks, format_func=lambda yw: f"Week {yw[1]}, {yw[0]}")
+
+with col2:
+    detail = st.selectbox("Map detail", list(DETAIL_LEVELS), index=1,
+                          help="Coarser outlines load faster; detailed ones are sharper when zoomed in.")
+
+try:
+    geojson = data_service.geometries(BUCKET_NAME, GEO_LEVELS_KEY.format(level=DETAIL_LEVELS[detail]))
+except Exception:
+    st.warning("Region outlines are not published yet; run the GTFS ETL first.")
+    st.stop()
+
+week_df = lookup(df, year_week).reset_index()
+
+layer = pdk.Layer(
+    "GeoJsonLayer",
+    data=colored_features(geojson, week_df),
+    get_fill_color="properties.fill",
+    get_line_color=[255, 255, 255],
+    line_width_min_pixels=1,
+    pickable=True,
+    auto_highlight=True,
+)
+
+st.pydeck_chart(pdk.Deck(
+    layers=[layer],
+    initial_view_state=pdk.ViewState(latitude=46.1, longitude=11.15, zoom=8),
+    tooltip={"text": "{Region}\nTourism index: {tourism_index}\n{experience_level}"},
+    map_style=None,
+))
@@ -0,0 +1,105 @@
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from utils.s3_utils import get_s3_etag, read_json_from_s3
+from utils.storage import get_storage, resolve
+from utils.loaders import load_predictions, load_preprocessed, index_predictions
+
+TTL_SECONDS = float(os.getenv("DASHBOARD_TTL_SECONDS", "60"))
+CUBE_COLUMNS = ["Region", "tourism_index_mean", "tourism_index_min", "tourism_index_max",
+                "tourism_index_count", "experience_level"]
+
+Entry = namedtuple("Entry", ["version", "value", "checked_at"])
+
+
+class ArtifactStore:
+    """Process-wide artifact cache shared by every session and page.
+
+    An artifact is loaded once; after `ttl` seconds its storage version (S3 ETag, file mtime) is checked
+    again and the artifact is only reloaded when the version changed. The new value replaces the old
+    one in a single assignment, so readers see either the old or the new artifact, never a mix.
+    Concurrent sessions asking for the same stale artifact wait for one load.
+    """
+
+    def __init__(self, ttl=TTL_SECONDS):
+        self.ttl = ttl
+        self._entries = {}
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock_for(self, name):
+        with self._locks_lock:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def _fresh(self, entry):
+        return entry is not None and time.monotonic() - entry.checked_at < self.ttl
+
+    def get(self, name, version_fn, load_fn):
+        entry = self._entries.get(name)
+        if self._fresh(entry):
+            return entry.value
+
+        with self._lock_for(name):
+            entry = self._entries.get(name)
+            if self._fresh(entry):
+                return entry.value
+            try:
+                version = version_fn()
+            except Exception as e:
+                if entry is None:
+                    raise
+                logging.warning(f"Could not revalidate {name}, serving the cached copy: {e}")
+                self._entries[name] = entry._replace(checked_at=time.monotonic())
+                return entry.value
+
+            if entry is not None and entry.version == version:
+                self._entries[name] = entry._replace(checked_at=time.monotonic())
+                return entry.value
+
+            value = load_fn()
+            self._entries[name] = Entry(version, value, time.monotonic())
+            logging.info(f"Loaded {name} (version {version})")
+            return value
+
+
+STORE = ArtifactStore()
+
+
+def _predictions_bundle(bucket_name, key):
+    df, top3 = index_predictions(load_predictions(bucket_name, key))
+    regions = sorted(df.index.get_level_values("Region").unique().tolist())
+    return df, top3, regions
+
+
+def predictions(bucket_name, key):
+    """(indexed predictions, top 3 per week, region list) for the forecast page."""
+    return STORE.get(
+        f"{get_storage(bucket_name).uri}/{key}",
+        lambda: get_s3_etag(bucket_name, key),
+        lambda: _predictions_bundle(bucket_name, key),
+    )
+
+
+def cube(path, by):
+    """A Region x `by` insight cube written by preprocess, shared by the insight pages; treat it as read-only.
+
+    `path` is a local path or a file:// or s3:// URI.
+    """
+    storage, key = resolve(path)
+    return STORE.get(
+        f"{storage.uri}/{key}",
+        lambda: storage.version(key),
+        lambda: load_preprocessed(path, [by] + CUBE_COLUMNS),
+    )
+
+
+def geometries(bucket_name, key):
+    """A simplified region GeoJSON published by gtfs_etl; treat it as read-only."""
+    return STORE.get(
+        f"{get_storage(bucket_name).uri}/{key}",
+        lambda: get_s3_etag(bucket_name, key),
+        lambda: read_json_from_s3(bucket_name, key),
+    )
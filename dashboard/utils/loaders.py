@@ -0,0 +1,35 @@
+from utils.s3_utils import read_from_s3
+from utils.storage import resolve
+from utils.schema import optimize_dtypes
+
+PREDICTION_COLUMNS = ["year", "week", "Region", "tourism_index", "experience_level"]
+
+
+def load_predictions(bucket_name, key):
+    df = read_from_s3(bucket_name, key, columns=PREDICTION_COLUMNS)
+    return df[PREDICTION_COLUMNS]
+
+
+def load_preprocessed(path, columns):
+    """Only `columns` of a CSV or Parquet artifact (local path, file:// or s3:// URI), with the compact dtypes."""
+    storage, key = resolve(path)
+    df = storage.read_frame(key, columns)
+    optimize_dtypes(df, label=path)
+    return df[columns]
+
+
+def index_predictions(df):
+    """Predictions indexed and sorted by (year, week, Region), plus the top 3 regions of every week."""
+    indexed = df.set_index(["year", "week", "Region"]).sort_index()
+    top3 = (
+        df.sort_values(["year", "week", "tourism_index"], ascending=[True, True, False], kind="stable")
+        .groupby(["year", "week"], sort=False, observed=True)
+        .head(3)
+        .set_index(["year", "week"])
+    )
+    return indexed, top3
+
+
+def lookup(indexed, key):
+    """Rows under a full or partial index key of a sorted frame (binary search), empty when missing."""
+    return indexed.loc[key:key]
@@ -1,42 +1,45 @@
-import boto3
 import io
 import logging
-import pandas as pd
 import json
+from utils.schema import optimize_dtypes
+from utils.storage import get_storage, is_columnar
 
 
 def save_to_s3(df, bucket_name, key):
-    s3 = boto3.client('s3')
-    csv_buffer = io.StringIO()
-    df.to_csv(csv_buffer, index=False)
-    s3.put_object(Bucket=bucket_name, Key=key, Body=csv_buffer.getvalue())
-    logging.info(f"Saved {key} to S3 bucket {bucket_name}")
-
-
-def read_from_s3(bucket_name, key):
-    s3 = boto3.client('s3')
-    obj = s3.get_object(Bucket=bucket_name, Key=key)
-    df = pd.read_csv(io.BytesIO(obj['Body'].read()))
+    storage = get_storage(bucket_name)
+    if is_columnar(key):
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+        body = buffer.getvalue()
+    else:
+        csv_buffer = io.StringIO()
+        df.to_csv(csv_buffer, index=False)
+        body = csv_buffer.getvalue()
+    storage.write_bytes(key, body)
+    logging.info(f"Saved {key} to {storage.uri}")
+
+
+def read_from_s3(bucket_name, key, optimize=True, columns=None):
+    df = get_storage(bucket_name).read_frame(key, columns)
+    if optimize:
+        optimize_dtypes(df, label=key)
     return df
 
-def save_json_to_s3(data, bucket_name, key):
-    """Save a Python dict/list as JSON to S3."""
-    json_str = json.dumps(data, ensure_ascii=False, indent=2)
+def get_s3_etag(bucket_name, key):
+    """Version of a stored object (S3 ETag, local mtime and size), without reading the body."""
+    return get_storage(bucket_name).version(key)
+
+def save_json_to_s3(data, bucket_name, key, compact=False):
+    """Save a Python dict/list as JSON to the bucket (without whitespace when `compact`)."""
+    if compact:
+        json_str = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    else:
+        json_str = json.dumps(data, ensure_ascii=False, indent=2)
 
-    s3 = boto3.client("s3")
-    s3.put_object(
-        Bucket=bucket_name,
-        Key=key,
-        Body=json_str,
-        ContentType='application/json'
-    )
+    get_storage(bucket_name).write_bytes(key, json_str, content_type='application/json')
 
 
 def read_json_from_s3(bucket_name, key):
-    """Read a JSON file from S3 and return a Python object."""
-    s3 = boto3.client("s3")
-    obj = s3.get_object(Bucket=bucket_name, Key=key)
-    json_str = obj['Body'].read().decode('utf-8')
+    """Read a JSON file from the bucket and return a Python object."""
+    json_str = get_storage(bucket_name).read_bytes(key).decode('utf-8')
     return json.loads(json_str)
-
-
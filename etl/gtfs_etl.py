@@ -1,25 +1,35 @@
 import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import geopandas as gpd
-from utils.gtfs_utils import normalize_text, merge_calendar_and_exceptions, expand_dates
-import json
+from utils.gtfs_utils import (normalize_text, load_comune_map, merge_calendar_and_exceptions, expand_dates, parse_feeds,
+                              feed_reader, feed_date_range, assign_date_windows, merge_geo_data, daily_departures)
 from utils.s3_utils import save_to_s3,save_json_to_s3
-
-BUCKET_NAME=os.getenv("TOURISM_BUCKET")
-if not BUCKET_NAME:
-    raise RuntimeError("TOURISM_BUCKET env var not set (BUCKET_NAME is required)")
-
+from utils.profiling import profiled
+from utils.context import context
+from utils.geo_utils import region_geometries
 
 PATH = os.getenv("GTFS_DATA_PATH")
+# Comma-separated feed directories or .zip archives, each optionally prefixed with its series
+# ("urban=gtfs/urban_2024.zip,extraurban=gtfs/extra_2024"). Archives of the same series are dated
+# versions of one network; different series are separate networks whose trips add up.
+PATHS = os.getenv("GTFS_DATA_PATHS", PATH or "")
 GEO_PATH = os.getenv("GEO_BOUNDARY_PATH")
+GEO_LEVELS_KEY = os.getenv("GEO_LEVELS_KEY", "geo/regions_{level}.geojson")
+GTFS_WORKERS = int(os.getenv("GTFS_WORKERS", "0")) or os.cpu_count()
+# "pandas" loads each feed in memory; "duckdb" runs the trip and departure aggregations as SQL over
+# the feed files, spilling to DUCKDB_TEMP_DIR past DUCKDB_MEMORY_LIMIT (feeds larger than RAM).
+GTFS_ENGINE = os.getenv("GTFS_ENGINE", "pandas")
 
 def load_gtfs_data(path=PATH, geo_path=GEO_PATH):
-    routes = pd.read_csv(f"{path}/routes.txt")
-    trips = pd.read_csv(f"{path}/trips.txt")
-    calendar = pd.read_csv(f"{path}/calendar.txt")
-    calendar_dates = pd.read_csv(f"{path}/calendar_dates.txt")
-    stops = pd.read_csv(f"{path}/stops.txt")
-    stop_times = pd.read_csv(f"{path}/stop_times.txt")
+    read = feed_reader(path)
+    routes = read("routes.txt")
+    trips = read("trips.txt")
+    calendar = read("calendar.txt")
+    calendar_dates = read("calendar_dates.txt")
+    stops = read("stops.txt")
+    stop_times = read("stop_times.txt")
     regions = gpd.read_file(geo_path)
 
     return {
@@ -33,12 +43,19 @@ def load_gtfs_data(path=PATH, geo_path=GEO_PATH):
     }
 
 
-def process_gtfs_data(data):
-    merged_calendar = merge_calendar_and_exceptions(data["calendar"], data["calendar_dates"])
-    trips_routes_and_calendar = pd.merge(data["trips"], merged_calendar, on="service_id", how="left")
-    
-    expanded = expand_dates(trips_routes_and_calendar)
+def load_gtfs_tables(path=PATH, geo_path=GEO_PATH):
+    """The small tables of a feed, for the duckdb engine: trips and stop_times stay on disk."""
+    read = feed_reader(path)
+    return {
+        "calendar": read("calendar.txt"),
+        "calendar_dates": read("calendar_dates.txt"),
+        "stops": read("stops.txt"),
+        "regions": gpd.read_file(geo_path),
+    }
 
+
+def locate_stops(data):
+    """Stops with the tourism region they fall in ("Unknown" outside the map), and each region's stop bounding box."""
     regions = data["regions"]
     stops = data["stops"]
     stops_gdf = gpd.GeoDataFrame(
@@ -49,8 +66,7 @@ def process_gtfs_data(data):
     regions = regions.to_crs("EPSG:4326")
     stops_with_regions = gpd.sjoin(stops_gdf, regions, how="left", predicate="within")
 
-    with open("utils/comune_to_region_map.json", "r", encoding="utf-8") as f:
-        comune_to_region = json.load(f)
+    comune_to_region = load_comune_map()
 
     stops_with_regions["tourism_region"] = stops_with_regions["COMUNE"].apply(normalize_text).map(comune_to_region).fillna("Unknown")
     regions = stops_with_regions['tourism_region'].unique().tolist()
@@ -67,6 +83,20 @@ def process_gtfs_data(data):
             'max_lat': float(max_lat),
             'min_lat': float(min_lat)
         }
+    return stops_with_regions, geo_data
+
+
+def gtfs_trip_days(data, date_window=None, located=None):
+    """One row per (trip_id, service date) with the trip's tourism region, plus each region's stop bounding box.
+
+    With a `date_window` (first, last), only service dates inside it are kept. `located` reuses locate_stops(data).
+    """
+    merged_calendar = merge_calendar_and_exceptions(data["calendar"], data["calendar_dates"])
+    trips_routes_and_calendar = pd.merge(data["trips"], merged_calendar, on="service_id", how="left")
+    
+    expanded = expand_dates(trips_routes_and_calendar)
+
+    stops_with_regions, geo_data = located or locate_stops(data)
     
     stop_times = data["stop_times"]
     stop_times_with_regions = pd.merge(stop_times, stops_with_regions[["stop_id", "tourism_region"]], on="stop_id", how="left")
@@ -89,21 +119,134 @@ def process_gtfs_data(data):
         how="left"
     )
     final_df["date"] = pd.to_datetime(final_df["date"])
+    if date_window is not None:
+        final_df = final_df[final_df["date"].between(*date_window)]
+    return final_df, geo_data
 
+
+def process_gtfs_data(data):
+    final_df, geo_data = gtfs_trip_days(data)
     monthly_trips = (
-        final_df.groupby(["tourism_region", final_df["date"].dt.to_period("M")])["trip_id"]
+        final_df.groupby(["tourism_region", final_df["date"].dt.to_period("M")], observed=True)["trip_id"]
+        .nunique()
+        .reset_index(name="num_trips")
+    )
+    daily_trips = (
+        final_df.groupby(["tourism_region", "date"], observed=True)["trip_id"]
         .nunique()
         .reset_index(name="num_trips")
     )
 
-    return monthly_trips, geo_data
+    return monthly_trips, geo_data, daily_trips
+
+
+def feed_departures(data, stops_with_regions, date_window=None):
+    calendar = merge_calendar_and_exceptions(data["calendar"], data["calendar_dates"])
+    return daily_departures(data["stop_times"], data["trips"], calendar,
+                            stops_with_regions[["stop_id", "tourism_region"]], date_window)
+
+
+def duckdb_feed(path, geo_path=GEO_PATH, date_window=None, workers=1):
+    """(trip_months, daily_trips, departures, geo_data) of one feed with the duckdb engine.
+
+    `workers` is the number of feeds processed at the same time; each gets its share of the memory
+    limit and threads.
+    """
+    from utils.gtfs_duckdb import feed_aggregates, connect, worker_share
+    data = load_gtfs_tables(path, geo_path)
+    stops_with_regions, geo_data = locate_stops(data)
+    calendar = merge_calendar_and_exceptions(data["calendar"], data["calendar_dates"])
+    trip_months, daily_trips, departures = feed_aggregates(
+        path, calendar, stops_with_regions[["stop_id", "tourism_region"]], date_window,
+        con=connect(*worker_share(workers)))
+    return trip_months, daily_trips, departures, geo_data
+
+
+def process_feed(feed, geo_path=GEO_PATH, engine=None, workers=1):
+    """Worker for one feed: its distinct region-month trips, daily trip counts and daily departures per
+    hour band inside the feed's date window. `workers` is the number of feeds processed concurrently."""
+    engine = engine or GTFS_ENGINE
+    if engine not in ("pandas", "duckdb"):
+        raise ValueError(f"Unknown GTFS_ENGINE '{engine}', expected 'pandas' or 'duckdb'")
+    if engine == "duckdb":
+        trip_months, daily_trips, departures, geo_data = duckdb_feed(feed.path, geo_path, feed.window, workers)
+        trip_months = trip_months.assign(series=feed.series)[["tourism_region", "date", "series", "trip_id"]]
+        logging.info(f"Processed GTFS feed {feed.series}={feed.path} with duckdb: {len(trip_months)} region-month trips "
+                     f"from {feed.window[0].date()} to {feed.window[1].date()}")
+        return trip_months, daily_trips, geo_data, departures
+
+    data = load_gtfs_data(feed.path, geo_path)
+    located = locate_stops(data)
+    final_df, geo_data = gtfs_trip_days(data, feed.window, located)
+    trip_months = (
+        final_df.assign(date=final_df["date"].dt.to_period("M"), series=feed.series)
+        [["tourism_region", "date", "series", "trip_id"]]
+        .drop_duplicates()
+    )
+    daily_trips = (
+        final_df.groupby(["tourism_region", "date"], observed=True)["trip_id"]
+        .nunique()
+        .reset_index(name="num_trips")
+    )
+    departures = feed_departures(data, located[0], feed.window)
+    logging.info(f"Processed GTFS feed {feed.series}={feed.path}: {len(final_df)} trip days "
+                 f"from {feed.window[0].date()} to {feed.window[1].date()}")
+    return trip_months, daily_trips, geo_data, departures
+
+
+def process_gtfs_feeds(feeds, geo_path=GEO_PATH, max_workers=GTFS_WORKERS):
+    """Process every feed in its own worker process and merge the results.
+
+    Within a series, a date covered by several archives is counted from the newest archive only, so
+    the feeds' outputs never overlap; a trip is identified by its series and trip_id.
+    """
+    feeds = assign_date_windows([feed._replace(window=feed_date_range(feed.path)) for feed in feeds])
+    if len(feeds) == 1:
+        results = [process_feed(feeds[0], geo_path)]
+    else:
+        workers = min(len(feeds), max_workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(process_feed, feeds, [geo_path] * len(feeds), [None] * len(feeds),
+                                    [workers] * len(feeds)))
+
+    trip_months = pd.concat([r[0] for r in results], ignore_index=True).drop_duplicates()
+    monthly_trips = (
+        trip_months.groupby(["tourism_region", "date"], observed=True)
+        .size()
+        .reset_index(name="num_trips")
+    )
+    daily_trips = (
+        pd.concat([r[1] for r in results], ignore_index=True)
+        .groupby(["tourism_region", "date"], as_index=False, observed=True)["num_trips"]
+        .sum()
+    )
+    departures = (
+        pd.concat([r[3] for r in results], ignore_index=True)
+        .groupby(["tourism_region", "date", "hour_band"], as_index=False, observed=True)["num_departures"]
+        .sum()
+    )
+    monthly_departures = (
+        departures.groupby(["tourism_region", departures["date"].dt.to_period("M")], observed=True)["num_departures"]
+        .sum()
+        .reset_index()
+    )
+    monthly_trips = monthly_trips.merge(monthly_departures, on=["tourism_region", "date"], how="left")
+    return monthly_trips, merge_geo_data([r[2] for r in results]), daily_trips, departures
 
 
 def add_mobility_index(tourism_movement_path, monthly_trips):
     tourism_movement = pd.read_csv(tourism_movement_path)
-    monthly_trips['month'] = monthly_trips['date'].dt.month
-    merged = pd.merge(tourism_movement, monthly_trips, left_on=['Region', 'Month_Num'], right_on=['tourism_region', 'month'], how='left')
-    merged.drop(columns=['tourism_region', 'month', 'date'], inplace=True)
+    monthly_trips = monthly_trips.assign(
+        Year=monthly_trips['date'].dt.year, Month_Num=monthly_trips['date'].dt.month
+    ).rename(columns={'tourism_region': 'Region'})
+    counts = [col for col in ('num_trips', 'num_departures') if col in monthly_trips.columns]
+    profile = monthly_trips.groupby(['Region', 'Month_Num'], as_index=False, observed=True)[counts].mean()
+    merged = pd.merge(tourism_movement, monthly_trips[['Region', 'Year', 'Month_Num'] + counts],
+                      on=['Region', 'Year', 'Month_Num'], how='left')
+    # Years no feed covers get the region's average for that month over the years that are covered.
+    merged = pd.merge(merged, profile, on=['Region', 'Month_Num'], how='left', suffixes=('', '_profile'))
+    for col in counts:
+        merged[col] = merged[col].fillna(merged.pop(f'{col}_profile'))
     july_missing = merged[(merged['Month_Num'] == 7) & (merged['num_trips'].isna())]
     for idx, row in july_missing.iterrows():
         region = row['Region']
@@ -117,18 +260,29 @@ def add_mobility_index(tourism_movement_path, monthly_trips):
         if len(sept_value) > 0:
             merged.at[idx, 'num_trips'] = sept_value[0]
 
-    save_to_s3(merged,BUCKET_NAME,"tourism_movement_with_gtfs.csv")
+    save_to_s3(merged,context().bucket,"tourism_movement_with_gtfs.csv")
     
 
 
 def main():
-    gtfs_data = load_gtfs_data(PATH)
-    monthly_trips, regions_with_boundries = process_gtfs_data(gtfs_data)
+    ctx = context()
+    ctx.setup_logging("gtfs_etl")
+    feeds = parse_feeds(PATHS)
+    if not feeds:
+        raise RuntimeError("GTFS_DATA_PATHS (or GTFS_DATA_PATH) env var not set")
+    monthly_trips, regions_with_boundries, daily_trips, departures = process_gtfs_feeds(feeds)
+    save_to_s3(daily_trips,ctx.bucket,"gtfs_daily_trips.csv")
+    save_to_s3(departures,ctx.bucket,"gtfs_daily_departures.csv")
     add_mobility_index("data/tourism_movement.csv", monthly_trips)
 
     json_path = "regions_boundries.json"
-    save_json_to_s3(regions_with_boundries,BUCKET_NAME,json_path)
+    save_json_to_s3(regions_with_boundries,ctx.bucket,json_path)
+
+    # Dissolved and simplified region outlines for the dashboard map, one small file per zoom level.
+    for level, geojson in region_geometries(gpd.read_file(GEO_PATH), load_comune_map()).items():
+        save_json_to_s3(geojson, ctx.bucket, GEO_LEVELS_KEY.format(level=level), compact=True)
 
 
 if __name__ == "__main__":
-    main()
+    with profiled("gtfs_etl"):
+        main()
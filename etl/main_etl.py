@@ -1,15 +1,11 @@
 import logging
 
-logging.basicConfig(
-    filename='logs/main_etl.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    force=True  
-)
-
 from etl.tourism_etl import tourism_mouvment
 from etl.weather_etl import weather_etl
 from etl.preprocess import preprocess
+from etl.weekly_features import weekly_features
+from utils.profiling import profiled
+from utils.context import context
 
 def run():
     logging.info("Starting tourism_etl ...")
@@ -27,11 +23,18 @@ def run():
             logging.info("All ETLs completed successfully.")
         except Exception as e:
             logging.exception(f"Downstream ETL failed: {e}")
+        try:
+            weekly_features()
+            logging.info("Weekly features updated.")
+        except Exception as e:
+            logging.exception(f"Weekly features ETL failed: {e}")
     else:
         logging.info("No new tourism data. Skipping weather and preprocessing.")
 
 
 def main():
+    # Configured before any stage runs, so every stage logs to main_etl.log.
+    context().setup_logging("main_etl")
     logging.info("="*40)
     logging.info("MAIN ETL PIPELINE STARTED")
     logging.info("="*40)
@@ -41,4 +44,5 @@ def main():
     logging.info("="*40)
 
 if __name__ == "__main__":
-    main()
+    with profiled("main_etl"):
+        main()
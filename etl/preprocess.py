@@ -1,30 +1,29 @@
 import pandas as pd
-from utils.preprocess_utils import merge_weather_tourism,compute_weather_score,get_season,categorize_experience
+from utils.preprocess_utils import merge_weather_tourism,compute_weather_scores,get_season,categorize_experience,insight_cube
 from utils.s3_utils import save_to_s3,save_json_to_s3
+from utils.profiling import profiled
+from utils.schema import optimize_dtypes
+from utils.context import context
+from utils.feature_store import pull_store, push_store, period_of
 import os
-BUCKET_NAME=os.getenv("TOURISM_BUCKET")
-if not BUCKET_NAME:
-    raise RuntimeError("TOURISM_BUCKET env var not set (BUCKET_NAME is required)")
-
 import logging
-logging.basicConfig(   
-    filename='logs/preprocess.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s')
 
 TOURISM_PATH = os.getenv("TOURISM_DATA_PATH", f"tourism_movement_with_gtfs.csv")
 
 
 def preprocess():
-    df=merge_weather_tourism(TOURISM_PATH,BUCKET_NAME)
+    ctx = context()
+    ctx.setup_logging("preprocess")
+    bucket = ctx.bucket
+    df=merge_weather_tourism(TOURISM_PATH,bucket)
 
     df["mobility_index"] = (
-        df.groupby("Region")["num_trips"]
+        df.groupby("Region", observed=True)["num_trips"]
         .transform(lambda x: (x - x.min()) / (x.max() - x.min()))
     )
     df["mobility_index"] = df["mobility_index"].fillna(0)
     df_tmp=df[["Region","Month_Num","mobility_index"]].drop_duplicates()
-    save_to_s3(df_tmp,BUCKET_NAME,"mobility_index_per_region.csv")
+    save_to_s3(df_tmp,bucket,"mobility_index_per_region.csv")
     
     logging.info("mobility index per region saved sucessfuly")
 
@@ -36,14 +35,14 @@ def preprocess():
     }
 
 
-    save_json_to_s3(scaling_params,BUCKET_NAME,"scaling_params.json")
+    save_json_to_s3(scaling_params,bucket,"scaling_params.json")
 
     df["season"] = df["Month_Num"].apply(get_season)
 
-    df["weather_score"] = df.apply(lambda row: compute_weather_score(row,scaling_params), axis=1)
+    df["weather_score"] = compute_weather_scores(df, scaling_params)
 
     df["presence_index"] = (
-    df.groupby("Region")["Total_presence"]
+    df.groupby("Region", observed=True)["Total_presence"]
     .transform(lambda x: (x - x.min()) / (x.max() - x.min()))
     )
 
@@ -51,12 +50,21 @@ def preprocess():
     df["year_month"]=df["Year"].astype(str)+'-'+df['Month_Num'].astype(str)
     df.set_index("year_month",inplace=True)
     df["experience_level"] = df["tourism_index"].apply(categorize_experience)
-    df["Region"] = df["Region"].str.replace(",", "", regex=False)
-    df["Region"] = df["Region"].str.replace(" ", "_", regex=False)
+    optimize_dtypes(df, label="preprocessed")
 
-    df=pd.get_dummies(df,columns=["Region"],prefix='region_')
-    save_to_s3(df,BUCKET_NAME,'preprocessed.csv')
+    save_to_s3(df,bucket,'preprocessed.csv')
     logging.info("Created preprocessed.csv for training ")
 
+    store = pull_store(bucket)
+    store.upsert(df.reset_index(drop=True).assign(period=period_of(df["Year"], df["Month_Num"]).values))
+    push_store(store, bucket)
+
+    # Small aggregates the dashboard insight pages read instead of the full history.
+    for by, key in (("Month_Num", "region_month_cube.parquet"), ("season", "region_season_cube.parquet")):
+        cube = insight_cube(df, by)
+        save_to_s3(cube, bucket, key)
+        logging.info(f"Saved {key} ({len(cube)} rows)")
+
 if __name__ == "__main__":
-    preprocess()
\ No newline at end of file
+    with profiled("preprocess"):
+        preprocess()
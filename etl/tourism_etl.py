@@ -4,16 +4,10 @@ from bs4 import BeautifulSoup
 import pandas as pd
 from datetime import datetime
 from utils.s3_utils import save_to_s3,read_from_s3
-BUCKET_NAME=os.getenv("TOURISM_BUCKET")
-if not BUCKET_NAME:
-    raise RuntimeError("TOURISM_BUCKET env var not set (BUCKET_NAME is required)")
-
+from utils.profiling import profiled
+from utils.context import context
 import logging
-logging.basicConfig(
-    filename='logs/tourism_etl.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+
 SAVING_PATH = os.getenv("TOURISM_MOVEMENT_PATH", "tourism_movement.csv")
 
 
@@ -56,16 +50,18 @@ def transform(presance,year):
     return df
 
 def load(df):
-    save_to_s3(df,BUCKET_NAME,SAVING_PATH)
+    save_to_s3(df,context().bucket,SAVING_PATH)
 
 def tourism_mouvment():
+    ctx = context()
+    ctx.setup_logging("tourism_etl")
     current_year = datetime.now().year
     all_data = pd.DataFrame()
     current_year = datetime.now().year
     all_data = pd.DataFrame()
     changed=False
     try:
-        existing_df = read_from_s3(BUCKET_NAME,SAVING_PATH)
+        existing_df = read_from_s3(ctx.bucket,SAVING_PATH)
         if not existing_df.empty:
             last_year = existing_df["Year"].max()
             if last_year == current_year:
@@ -94,7 +90,8 @@ def tourism_mouvment():
 
 if __name__ == "__main__":
 
-    tourism_mouvment()
+    with profiled("tourism_etl"):
+        tourism_mouvment()
 
 
 
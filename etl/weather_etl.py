@@ -1,10 +1,9 @@
 import pandas as pd
-import openmeteo_requests
 import logging
 import os
-import requests_cache
-from retry_requests import retry
 from utils.s3_utils import save_to_s3
+from utils.profiling import profiled
+from utils.context import context
 # Load environment variables safely (provide defaults for local testing)
 URL = os.getenv("OPENMETEO_API_URL", "https://archive-api.open-meteo.com/v1/archive")
 PATH = os.getenv("REGIONS_BOUNDARIES_PATH", "regions_boundries.json")
@@ -13,21 +12,17 @@ END_DATE = os.getenv("WEATHER_END_DATE", "2025-07-31")
 CACHE_DIR = os.getenv("REQUESTS_CACHE_DIR", ".cache")
 LOG_PATH = os.getenv("WEATHER_LOG_PATH", "logs/weather_etl.log")
 DATA_DIR = os.getenv("DATA_DIR", "data")
-BUCKET_NAME=os.getenv("TOURISM_BUCKET")
-if not BUCKET_NAME:
-    raise RuntimeError("TOURISM_BUCKET env var not set (BUCKET_NAME is required)")
 
-# Setup logging
-logging.basicConfig(
-    filename=LOG_PATH,
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 
-# Setup cache and retry for requests
-cache_session = requests_cache.CachedSession(CACHE_DIR, expire_after=3600)
-retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
-openmeteo = openmeteo_requests.Client(session=retry_session)
+def make_openmeteo_client():
+    """Open-Meteo client over a cached session that retries failed requests."""
+    import openmeteo_requests
+    import requests_cache
+    from retry_requests import retry
+
+    cache_session = requests_cache.CachedSession(CACHE_DIR, expire_after=3600)
+    retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
+    return openmeteo_requests.Client(session=retry_session)
 
 def fetch_weather_data(lat, lon):
     params = {
@@ -44,6 +39,7 @@ def fetch_weather_data(lat, lon):
         ]   
     }
 
+    openmeteo = context().client("openmeteo", make_openmeteo_client)
     responses = openmeteo.weather_api(URL, params=params)
     for response in responses:
         print(f"\nCoordinates: {response.Latitude()}°N {response.Longitude()}°E")
@@ -79,6 +75,7 @@ def extract(lat, lon):
     return fetch_weather_data(str(lat), str(lon))
 
 def transform(path):
+    bucket = context().bucket
     df = pd.read_json(path).T
 
     for region in df.index:
@@ -93,16 +90,18 @@ def transform(path):
             df_tmp = extract(lat, lon)
             logging.info(f"Successfully extracted weather data for region: {region} from {START_DATE} to {END_DATE}")
             try:
-                save_to_s3(df_tmp, BUCKET_NAME, f"weather_data_{region}.csv")
+                save_to_s3(df_tmp, bucket, f"weather_data_{region}.csv")
             except Exception as e:
                 logging.error(f"Failed to save weather data for {region} to S3: {e}")
                 continue
 
 
 def weather_etl(path=PATH):
+    context().setup_logging("weather_etl", LOG_PATH)
     logging.info("Starting weather ETL process")
     transform(path)
     logging.info("Weather ETL process completed successfully")
 
 if __name__ == "__main__":
-    weather_etl()
+    with profiled("weather_etl"):
+        weather_etl()
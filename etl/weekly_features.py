@@ -0,0 +1,61 @@
+import os
+import logging
+import pandas as pd
+from utils.s3_utils import save_to_s3, read_from_s3, read_json_from_s3
+from utils.weekly_utils import build_weekly_features, upsert_weeks
+from utils.profiling import profiled
+from utils.context import context
+
+REGIONS_PATH = os.getenv("REGIONS_BOUNDARIES_PATH", "regions_boundries.json")
+DAILY_TRIPS_PATH = os.getenv("GTFS_DAILY_TRIPS_PATH", "gtfs_daily_trips.csv")
+WEEKLY_PATH = os.getenv("WEEKLY_FEATURES_PATH", "weekly_features.csv")
+
+
+def load_daily_weather(regions):
+    bucket = context().bucket
+    frames = []
+    for region in regions:
+        if region.lower() != "unknown":
+            df = read_from_s3(bucket, f"weather_data_{region}.csv")
+            df["Region"] = region
+            frames.append(df)
+    weather = pd.concat(frames, ignore_index=True)
+    weather["date"] = pd.to_datetime(weather["date"], utc=True).dt.tz_localize(None)
+    return weather
+
+
+def weekly_features(full_refresh=False):
+    """Build Region x ISO week features, recomputing only the weeks from the last stored one onward."""
+    ctx = context()
+    ctx.setup_logging("weekly_features")
+    bucket = ctx.bucket
+    regions = list(read_json_from_s3(bucket, REGIONS_PATH).keys())
+    weather = load_daily_weather(regions)
+    daily_trips = read_from_s3(bucket, DAILY_TRIPS_PATH)
+    daily_trips["date"] = pd.to_datetime(daily_trips["date"])
+
+    existing = None
+    if not full_refresh:
+        try:
+            existing = read_from_s3(bucket, WEEKLY_PATH)
+            existing["week_start"] = pd.to_datetime(existing["week_start"])
+        except Exception:
+            logging.info("No existing weekly features, building them from scratch.")
+
+    if existing is not None and not existing.empty:
+        # The last stored week may have been partial, so it is rebuilt along with everything newer.
+        since = existing["week_start"].max()
+        weather = weather[weather["date"] >= since]
+        daily_trips = daily_trips[daily_trips["date"] >= since]
+        logging.info(f"Updating weekly features from {since.date()} ({len(weather)} new daily weather rows)")
+
+    fresh = build_weekly_features(weather, daily_trips)
+    features = upsert_weeks(existing, fresh)
+    save_to_s3(features, bucket, WEEKLY_PATH)
+    logging.info(f"Saved {len(features)} region-week rows to {WEEKLY_PATH}")
+    return features
+
+
+if __name__ == "__main__":
+    with profiled("weekly_features"):
+        weekly_features()
@@ -0,0 +1,49 @@
+import os
+import logging
+from utils.s3_utils import read_from_s3, read_json_from_s3, save_to_s3
+from utils.forecast_utils import load_predictor, upcoming_weeks, region_month_profile, build_forecast_frame, predict_tourism_index
+from utils.preprocess_utils import categorize_experience_array
+from utils.profiling import profiled
+
+logging.basicConfig(
+    filename="logs/forecast.log",
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+DATA_PATH = os.getenv("DATA_PATH", "preprocessed.csv")
+FORECAST_PATH = os.getenv("FORECAST_CSV_PATH", "predictions.csv")
+FORECAST_HORIZON_WEEKS = int(os.getenv("FORECAST_HORIZON_WEEKS", "4"))
+S3_BUCKET = os.getenv("TOURISM_BUCKET")
+S3_KEY = "models/xgb.pkl"
+META_KEY = "models/xgb_meta.json"
+
+
+def forecast(df, model, features, categories, n_weeks=FORECAST_HORIZON_WEEKS):
+    """Score every region x upcoming week in a single predict call; regions the model can't score are dropped."""
+    profile = region_month_profile(df, features)
+    frame = build_forecast_frame(profile, upcoming_weeks(n_weeks))
+    frame["tourism_index"] = predict_tourism_index(model, frame, features, categories).round(3)
+    # Per-region predictors give NaN for regions without a model (e.g. added after the last training).
+    unscored = frame["tourism_index"].isna()
+    if unscored.any():
+        logging.warning(f"No model for regions {sorted(frame.loc[unscored, 'Region'].unique())}, not forecast")
+        frame = frame[~unscored].reset_index(drop=True)
+    frame["experience_level"] = categorize_experience_array(frame["tourism_index"])
+    return frame[["year", "week", "Region", "tourism_index", "experience_level"]]
+
+
+def main():
+    df = read_from_s3(S3_BUCKET, DATA_PATH)
+    meta = read_json_from_s3(S3_BUCKET, META_KEY)
+    model = load_predictor(S3_BUCKET, S3_KEY, meta)
+
+    predictions = forecast(df, model, meta["features"], meta["region_categories"])
+    save_to_s3(predictions, S3_BUCKET, FORECAST_PATH)
+    logging.info(f"Saved {len(predictions)} forecasts for {predictions['Region'].nunique()} regions "
+                 f"x {FORECAST_HORIZON_WEEKS} weeks to {FORECAST_PATH}")
+
+
+if __name__ == "__main__":
+    with profiled("forecast"):
+        main()
@@ -0,0 +1,70 @@
+"""What-if tourism_index bands per region under perturbed weather and mobility.
+
+    SCENARIO_SPEC='{"temperature_2m_mean": {"op": "add", "dist": "normal", "args": [3, 0.5]},
+                    "snowfall_sum": {"op": "mul", "dist": "constant", "args": [2]}}' python -m src.scenarios
+
+SCENARIO_SPEC is JSON or a path to a JSON file; see utils.scenario_utils.sample_perturbations.
+"""
+import os
+import json
+import time
+import logging
+from datetime import date
+from utils.s3_utils import read_from_s3, read_json_from_s3, save_to_s3
+from utils.forecast_utils import load_predictor, region_month_profile
+from utils.preprocess_utils import WEATHER_INPUTS
+from utils.scenario_utils import run_scenarios
+from utils.serving_utils import model_predict_fn
+from utils.profiling import profiled
+
+logging.basicConfig(
+    filename="logs/scenarios.log",
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+DATA_PATH = os.getenv("DATA_PATH", "preprocessed.csv")
+SCENARIO_SPEC = os.getenv("SCENARIO_SPEC", "{}")
+SCENARIO_MONTH = int(os.getenv("SCENARIO_MONTH", "0")) or date.today().month % 12 + 1
+SCENARIO_SAMPLES = int(os.getenv("SCENARIO_SAMPLES", "10000"))
+SCENARIO_SEED = int(os.getenv("SCENARIO_SEED", "42"))
+SCENARIO_OUTPUT_PATH = os.getenv("SCENARIO_OUTPUT_PATH", "scenario_bands.csv")
+S3_BUCKET = os.getenv("TOURISM_BUCKET")
+S3_KEY = "models/xgb.pkl"
+META_KEY = "models/xgb_meta.json"
+
+
+def load_spec(spec=SCENARIO_SPEC):
+    if os.path.exists(spec):
+        with open(spec, encoding="utf-8") as f:
+            return json.load(f)
+    return json.loads(spec)
+
+
+def scenarios(df, model, meta, scaling_params, spec, month=SCENARIO_MONTH, n_samples=SCENARIO_SAMPLES):
+    """Percentile bands of every region's tourism_index in `month` under the perturbations in `spec`."""
+    columns = list(dict.fromkeys(meta["features"] + WEATHER_INPUTS))
+    profile = region_month_profile(df, columns)
+    base = profile[profile["Month_Num"] == month]
+    start = time.perf_counter()
+    bands = run_scenarios(model_predict_fn(model), base, meta["features"], meta["region_categories"],
+                          scaling_params, spec, n_samples=n_samples, seed=SCENARIO_SEED)
+    elapsed = time.perf_counter() - start
+    logging.info(f"Scored {len(bands) * n_samples} scenario rows in {elapsed:.2f}s "
+                 f"({len(bands) * n_samples / elapsed:,.0f} rows/s)")
+    return bands.assign(Month_Num=month)
+
+
+def main():
+    df = read_from_s3(S3_BUCKET, DATA_PATH)
+    meta = read_json_from_s3(S3_BUCKET, META_KEY)
+    scaling_params = read_json_from_s3(S3_BUCKET, "scaling_params.json")
+    model = load_predictor(S3_BUCKET, S3_KEY, meta)
+
+    bands = scenarios(df, model, meta, scaling_params, load_spec())
+    save_to_s3(bands, S3_BUCKET, SCENARIO_OUTPUT_PATH)
+
+
+if __name__ == "__main__":
+    with profiled("scenarios"):
+        main()
@@ -0,0 +1,219 @@
+"""Local HTTP prediction service for tourism_index.
+
+    GET  /predict?region=Val+di+Fassa&year=2025&week=32&temperature_2m_mean=24
+    POST /predict   {"region": ..., "year": ..., "week": ..., "weather": {...}}  (or a list of those)
+    GET  /regions
+    GET  /health
+"""
+import os
+import json
+import logging
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+from utils.s3_utils import read_from_s3, read_json_from_s3
+from utils.forecast_utils import load_predictor, region_month_profile
+from utils.preprocess_utils import compute_weather_score, get_season, categorize_experience, WEATHER_INPUTS
+from utils.serving_utils import LRUCache, MicroBatcher, PredictionError, model_predict_fn
+from utils.feature_store import pull_store
+
+logging.basicConfig(
+    filename="logs/serve.log",
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+DATA_PATH = os.getenv("DATA_PATH", "preprocessed.csv")
+S3_BUCKET = os.getenv("TOURISM_BUCKET")
+S3_KEY = "models/xgb.pkl"
+META_KEY = "models/xgb_meta.json"
+SERVE_HOST = os.getenv("SERVE_HOST", "127.0.0.1")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8080"))
+SERVE_COMPILE = os.getenv("SERVE_COMPILE", "0") == "1"
+SERVE_CACHE_SIZE = int(os.getenv("SERVE_CACHE_SIZE", "4096"))
+SERVE_MAX_BATCH = int(os.getenv("SERVE_MAX_BATCH", "256"))
+SERVE_MAX_WAIT_MS = float(os.getenv("SERVE_MAX_WAIT_MS", "2"))
+# SERVE_FEATURE_STORE=1 answers periods the feature store has rows for with their stored features.
+SERVE_FEATURE_STORE = os.getenv("SERVE_FEATURE_STORE", "0") == "1"
+REQUIRED_FIELDS = ("region", "year", "week")
+
+
+class ForecastService:
+    def __init__(self, model, features, region_categories, profile, scaling_params, compile_model=False,
+                 cache_size=SERVE_CACHE_SIZE, max_batch=SERVE_MAX_BATCH, max_wait_ms=SERVE_MAX_WAIT_MS,
+                 store=None):
+        self.features = features
+        self.store = store
+        # The booster takes Region as its category code, in the order it was trained with.
+        self.region_codes = {region: code for code, region in enumerate(region_categories)}
+        self.scaling_params = scaling_params
+        columns = list(dict.fromkeys(features + WEATHER_INPUTS))
+        # Numeric inputs a request may override; Region and Month_Num come from the request itself.
+        self.override_names = [col for col in columns if col not in ("Region", "Month_Num")]
+        self.store_features = [col for col in columns if col != "Region"]
+        self.profile = {
+            (row["Region"], int(row["Month_Num"])): {col: row[col] for col in columns if col in row}
+            for row in profile.to_dict("records")
+        }
+        self.regions = sorted({region for region, _ in self.profile})
+        self.feature_cache = LRUCache(cache_size)
+        self.result_cache = LRUCache(cache_size)
+        self.batcher = MicroBatcher(model_predict_fn(model, compile_model),
+                                    max_batch=max_batch, max_wait=max_wait_ms / 1000)
+
+    def stored_row(self, region, period):
+        """The feature store row of (region, period) without its missing values, empty when there is none."""
+        rows = self.store.lookup([(region, period)], self.store_features)
+        if rows.empty:
+            return {}
+        return {col: value for col, value in rows.iloc[0].items() if col != "Region" and pd.notna(value)}
+
+    def feature_vector(self, region, month, overrides, period=None):
+        key = (region, period if self.store is not None else month, tuple(sorted(overrides.items())))
+        vector = self.feature_cache.get(key)
+        if vector is not None:
+            return vector
+        base = self.profile.get((region, month))
+        if self.store is not None and period is not None:
+            stored = self.stored_row(region, period)
+            base = dict(base or {}, **stored) if stored else base
+        if base is None:
+            raise KeyError(f"No profile for region '{region}' in month {month}")
+        row = dict(base, Month_Num=month, **overrides)
+        row["Region"] = self.region_codes[region]
+        # Overriding any weather input recomputes weather_score.
+        if any(name in overrides for name in WEATHER_INPUTS) and "weather_score" not in overrides:
+            row["weather_score"] = compute_weather_score(dict(row, season=get_season(month)), self.scaling_params)
+        vector = np.array([row.get(col, np.nan) for col in self.features], dtype=np.float32)
+        self.feature_cache.put(key, vector)
+        return vector
+
+    def predict(self, region, year, week, overrides=None):
+        month = date.fromisocalendar(year, week, 4).month
+        vector = self.feature_vector(region, month, {k: float(v) for k, v in (overrides or {}).items()},
+                                     period=year * 100 + month)
+        key = vector.tobytes()
+        score = self.result_cache.get(key)
+        if score is None:
+            score = min(1.0, max(0.0, self.batcher.predict(vector)))
+            self.result_cache.put(key, score)
+        return {
+            "region": region,
+            "year": year,
+            "week": week,
+            "tourism_index": round(score, 4),
+            "experience_level": categorize_experience(score),
+        }
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _overrides(self, request):
+            """The feature overrides of a request, or an error message naming the fields that can't be one."""
+            weather = request.get("weather") or {}
+            if not isinstance(weather, dict):
+                return None, "weather must be a JSON object of feature values"
+            overrides = dict(weather, **{k: v for k, v in request.items() if k not in REQUIRED_FIELDS + ("weather",)})
+            unknown = sorted(k for k in overrides if k not in service.override_names)
+            if unknown:
+                return None, (f"Cannot override {', '.join(unknown)}; "
+                              f"overridable features are {', '.join(service.override_names)}")
+            try:
+                return {k: float(v) for k, v in overrides.items()}, None
+            except (TypeError, ValueError):
+                return None, "Feature overrides must be numbers"
+
+        def _answer(self, request, overrides):
+            return service.predict(request["region"], int(request["year"]), int(request["week"]), overrides)
+
+        def _handle(self, requests):
+            for request in requests:
+                if not isinstance(request, dict):
+                    return self._send(400, {"error": "Each request must be a JSON object"})
+                missing = [field for field in REQUIRED_FIELDS if field not in request]
+                if missing:
+                    return self._send(400, {"error": f"Missing required fields: {', '.join(missing)}"})
+            overrides = []
+            for request in requests:
+                values, error = self._overrides(request)
+                if error:
+                    return self._send(400, {"error": error})
+                overrides.append(values)
+            try:
+                results = [self._answer(request, values) for request, values in zip(requests, overrides)]
+            except FutureTimeout:
+                return self._send(503, {"error": "Prediction timed out, try again"})
+            except PredictionError as e:
+                return self._send(500, {"error": str(e)})
+            except KeyError as e:
+                return self._send(404, {"error": str(e)})
+            except (TypeError, ValueError) as e:
+                return self._send(400, {"error": str(e)})
+            self._send(200, results if len(results) != 1 else results[0])
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/health":
+                return self._send(200, {
+                    "status": "ok",
+                    "regions": len(service.regions),
+                    "feature_cache_hits": service.feature_cache.hits,
+                    "result_cache_hits": service.result_cache.hits,
+                })
+            if url.path == "/regions":
+                return self._send(200, service.regions)
+            if url.path != "/predict":
+                return self._send(404, {"error": f"Unknown path {url.path}"})
+            self._handle([{k: v[0] for k, v in parse_qs(url.query).items()}])
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/predict":
+                return self._send(404, {"error": f"Unknown path {self.path}"})
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            except json.JSONDecodeError as e:
+                return self._send(400, {"error": str(e)})
+            self._handle(payload if isinstance(payload, list) else [payload])
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def build_service(compile_model=SERVE_COMPILE):
+    df = read_from_s3(S3_BUCKET, DATA_PATH)
+    meta = read_json_from_s3(S3_BUCKET, META_KEY)
+    scaling_params = read_json_from_s3(S3_BUCKET, "scaling_params.json")
+    model = load_predictor(S3_BUCKET, S3_KEY, meta)
+    columns = list(dict.fromkeys(meta["features"] + WEATHER_INPUTS))
+    profile = region_month_profile(df, columns)
+    store = pull_store(S3_BUCKET) if SERVE_FEATURE_STORE else None
+    return ForecastService(model, meta["features"], meta["region_categories"], profile, scaling_params,
+                           compile_model=compile_model, store=store)
+
+
+def main():
+    service = build_service()
+    server = ThreadingHTTPServer((SERVE_HOST, SERVE_PORT), make_handler(service))
+    logging.info(f"Serving {len(service.regions)} regions on http://{SERVE_HOST}:{SERVE_PORT}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,22 @@
 import os
+import json
+import time
+from datetime import datetime
+import numpy as np
 import mlflow
 import mlflow.xgboost
 from mlflow.models import infer_signature
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.model_selection import train_test_split, GridSearchCV, ParameterGrid
 from xgboost import XGBRegressor
 from sklearn.metrics import mean_absolute_error, r2_score, mean_absolute_percentage_error
-from utils.s3_utils import read_from_s3
-import boto3
+from utils.s3_utils import read_from_s3, save_json_to_s3, read_json_from_s3, get_s3_etag
+from utils.profiling import profiled
+from utils.forecast_utils import load_model, as_region_category
+from utils.train_utils import successive_halving_search, make_model, holdout_fold, time_series_folds, plan_cores
+from utils.feature_store import pull_store
+from utils.region_models import region_groups, group_keys, train_groups
+from utils.train_matrix import MatrixCache, cached_frame, fit_cached
+from utils.storage import get_storage
 
 import logging
 logging.basicConfig(
@@ -17,85 +27,413 @@ logging.basicConfig(
 
 
 DATA_PATH = os.getenv("DATA_PATH", "preprocessed.csv")
+# DATA_SOURCE=store trains on a point-in-time snapshot of the feature store instead of DATA_PATH;
+# the same TRAIN_AS_OF (ISO timestamp, default now) always gives the same training set.
+DATA_SOURCE = os.getenv("DATA_SOURCE", "csv")
+TRAIN_AS_OF = os.getenv("TRAIN_AS_OF") or None
 EXPERIMENT_NAME = os.getenv("MLFLOW_EXPERIMENT_NAME", "Tourism_Presence_Prediction")
 REGISTERED_MODEL_NAME = os.getenv("MLFLOW_REGISTERED_MODEL_NAME", "TourismPresenceXGB")
-S3_BUCKET = os.getenv("TOURISM_BUCKET")   
+S3_BUCKET = os.getenv("TOURISM_BUCKET")
 S3_KEY = "models/xgb.pkl"
+META_KEY = "models/xgb_meta.json"
+
+# TRAIN_MODE=incremental continues boosting the current model on new periods instead of searching again;
+# TRAIN_MODE=per_region trains one model per region (or per cluster of REGION_CLUSTERS_PATH) in parallel.
+TRAIN_MODE = os.getenv("TRAIN_MODE", "full")
+MODEL_SOURCE = os.getenv("MODEL_SOURCE", "s3")
+INCREMENTAL_ROUNDS = int(os.getenv("INCREMENTAL_ROUNDS", "50"))
+INCREMENTAL_DRIFT_THRESHOLD = float(os.getenv("INCREMENTAL_DRIFT_THRESHOLD", "0.25"))
+
+# SEARCH_MODE=halving runs the budgeted successive-halving search, SEARCH_MODE=grid the full GridSearchCV.
+SEARCH_MODE = os.getenv("SEARCH_MODE", "halving")
+SEARCH_MAX_TRIALS = int(os.getenv("SEARCH_MAX_TRIALS", "27"))
+SEARCH_TIME_BUDGET = float(os.getenv("SEARCH_TIME_BUDGET", "600"))
+SEARCH_MIN_ROUNDS = int(os.getenv("SEARCH_MIN_ROUNDS", "100"))
+SEARCH_MAX_ROUNDS = int(os.getenv("SEARCH_MAX_ROUNDS", "800"))
+EARLY_STOPPING_ROUNDS = int(os.getenv("EARLY_STOPPING_ROUNDS", "50"))
+# Rows are sorted by period; CV_STRATEGY=timeseries validates on expanding-window folds, holdout on the
+# latest validation_size of the training rows.
+CV_STRATEGY = os.getenv("CV_STRATEGY", "holdout")
+CV_FOLDS = int(os.getenv("CV_FOLDS", "3"))
+TRAIN_CORES = int(os.getenv("TRAIN_CORES", "0")) or None
+TRAIN_MAX_WORKERS = int(os.getenv("TRAIN_MAX_WORKERS", "0")) or None
+# TRAIN_MATRIX_CACHE=1 caches the training data per data version and fits the halving search on
+# QuantileDMatrix objects built once per fold (see utils/train_matrix.py).
+TRAIN_MATRIX_CACHE = os.getenv("TRAIN_MATRIX_CACHE", "1") == "1"
+# Optional JSON {cluster: [regions]}; regions in no cluster get a model of their own.
+REGION_CLUSTERS_PATH = os.getenv("REGION_CLUSTERS_PATH")
+REGION_SEARCH_MAX_TRIALS = int(os.getenv("REGION_SEARCH_MAX_TRIALS", "9"))
+REGION_SEARCH_TIME_BUDGET = float(os.getenv("REGION_SEARCH_TIME_BUDGET", "120"))
 
 test_size = 0.3
+validation_size = 0.2
 cv = 3
 
 
-df=read_from_s3(S3_BUCKET,DATA_PATH)
+def make_folds(X_train, periods):
+    if CV_STRATEGY == "timeseries":
+        return time_series_folds(periods, n_splits=CV_FOLDS)
+    if CV_STRATEGY == "holdout":
+        return holdout_fold(len(X_train), validation_size)
+    raise ValueError(f"Unknown CV_STRATEGY '{CV_STRATEGY}', expected 'holdout' or 'timeseries'")
 
-X = df[[
-    "Month_Num", "mobility_index", "weather_score",
-    "temperature_2m_mean", "cloud_cover_mean", "snowfall_sum", "snowy_day"
-] + [col for col in df.columns if col.startswith("region_")]]
 
-y = df["tourism_index"]
+def grid_search(X_train, y_train, periods):
+    folds = time_series_folds(periods, n_splits=CV_FOLDS) if CV_STRATEGY == "timeseries" else cv
+    n_splits = len(folds) if CV_STRATEGY == "timeseries" else cv
+    param_grid = {
+        'n_estimators': [200, 600, 800],
+        'learning_rate': [0.003, 0.01, 0.03],
+        'max_depth': [3, 5, 7],
+        'subsample': [0.7, 0.9, 1.0],
+        'colsample_bytree': [0.7, 0.9, 1.0]
+    }
+    # Give GridSearchCV the workers and each XGBoost fit the remaining threads, instead of both using -1.
+    workers, threads = plan_cores(len(ParameterGrid(param_grid)) * n_splits, TRAIN_CORES, TRAIN_MAX_WORKERS)
 
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=test_size, shuffle=False
-)
+    xgb = XGBRegressor(
+        objective='reg:squarederror',
+        tree_method='hist',
+        enable_categorical=True,
+        random_state=42,
+        n_jobs=threads
+    )
 
+    grid_search = GridSearchCV(
+        estimator=xgb,
+        param_grid=param_grid,
+        scoring='r2',
+        cv=folds,
+        verbose=2,
+        n_jobs=workers
+    )
+    start = time.perf_counter()
+    grid_search.fit(X_train, y_train)
+    minutes = (time.perf_counter() - start) / 60
+    n_trials = len(grid_search.cv_results_["params"])
+    mlflow.log_params({"cv": n_splits, "workers": workers, "threads_per_fit": threads})
+    mlflow.log_metric("trials_per_minute", n_trials / minutes)
+    logging.info(f"Grid search: {n_trials} trials in {minutes:.1f} min ({n_trials / minutes:.1f} trials/min)")
+    return grid_search.best_estimator_, grid_search.best_params_
 
-xgb = XGBRegressor(
-    objective='reg:squarederror',
-    random_state=42,
-    n_jobs=-1
-)
 
-param_grid = {
-    'n_estimators': [200, 600, 800],
-    'learning_rate': [0.003, 0.01, 0.03],
-    'max_depth': [3, 5, 7],
-    'subsample': [0.7, 0.9, 1.0],
-    'colsample_bytree': [0.7, 0.9, 1.0]
-}
-
-grid_search = GridSearchCV(
-    estimator=xgb,
-    param_grid=param_grid,
-    scoring='r2',
-    cv=cv,
-    verbose=2,
-    n_jobs=-1
-)
+def log_trial(params, metrics):
+    with mlflow.start_run(run_name=f"trial_{metrics['trial']}_rung_{metrics['rung']}", nested=True):
+        mlflow.log_params(params)
+        mlflow.log_params({"n_estimators": metrics["n_estimators"], "rung": metrics["rung"]})
+        mlflow.log_metrics({
+            "val_rmse": metrics["rmse"],
+            "val_r2": metrics["r2"],
+            "best_iteration": metrics["best_iteration"],
+        })
+
 
-mlflow.set_experiment(EXPERIMENT_NAME)
+def halving_search(X_train, y_train, periods):
+    folds = make_folds(X_train, periods)
+    matrices = MatrixCache(X_train, y_train) if TRAIN_MATRIX_CACHE else None
+    best_params, best_metrics, stats = successive_halving_search(
+        X_train, y_train, folds,
+        n_trials=SEARCH_MAX_TRIALS,
+        min_rounds=SEARCH_MIN_ROUNDS,
+        max_rounds=SEARCH_MAX_ROUNDS,
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+        time_budget=SEARCH_TIME_BUDGET,
+        log_trial=log_trial,
+        total_cores=TRAIN_CORES,
+        max_workers=TRAIN_MAX_WORKERS,
+        matrices=matrices,
+    )
+    logging.info(f"Best trial {best_metrics['trial']}: {best_params} (val rmse {best_metrics['rmse']:.5f})")
 
+    # Refit on the whole training split with the number of rounds early stopping picked.
+    n_estimators = best_metrics["best_iteration"] + 1
+    if matrices is not None:
+        best_model = fit_cached(matrices, best_params, n_estimators)
+        stats = dict(stats, matrix_builds=matrices.builds)
+        matrices.close()
+    else:
+        best_model = make_model(best_params, n_estimators)
+        best_model.fit(X_train, y_train)
+    mlflow.log_params({
+        "n_folds": len(folds),
+        "search_max_trials": SEARCH_MAX_TRIALS,
+        "search_time_budget": SEARCH_TIME_BUDGET,
+        "matrix_cache": TRAIN_MATRIX_CACHE,
+    })
+    mlflow.log_metrics(stats)
+    return best_model, dict(best_params, n_estimators=n_estimators)
 
-with mlflow.start_run(run_name="XGBoost_GridSearch") as run:
-    grid_search.fit(X_train, y_train)
 
-    best_model = grid_search.best_estimator_
-    best_params = grid_search.best_params_
+def select_features(df, region_categories=None):
+    # Region stays a single categorical column and goes through XGBoost's native categorical splits.
+    region_categories = region_categories or sorted(df["Region"].unique())
+    X = df[[
+        "Month_Num", "mobility_index", "weather_score",
+        "temperature_2m_mean", "cloud_cover_mean", "snowfall_sum", "snowy_day", "Region"
+    ]].assign(Region=as_region_category(df["Region"], region_categories))
 
-    y_pred = best_model.predict(X_test)
-    r2 = r2_score(y_test, y_pred)
-    mae = mean_absolute_error(y_test, y_pred)
-    mape = mean_absolute_percentage_error(y_test, y_pred)
+    y = df["tourism_index"]
+    return X, y
 
-    mlflow.log_params({"test_size": test_size, "cv": cv})
-    mlflow.log_params(best_params)
-    mlflow.log_metric("r2", r2)
-    mlflow.log_metric("mape", mape)
-    mlflow.log_metric("mae", mae)
 
+def data_periods(df):
+    return df["Year"].astype("int32") * 100 + df["Month_Num"]
+
+
+def publish_model(model, params, X_ref, y_pred_ref, meta):
+    """Save the model locally, to S3 and to the MLflow registry, together with its metadata."""
     os.makedirs("models", exist_ok=True)
     local_model_path = "models/xgb.pkl"
-    best_model.save_model(local_model_path)
+    model.save_model(local_model_path)
+
 
+    storage = get_storage(S3_BUCKET)
+    storage.upload(local_model_path, S3_KEY)
+    logging.info(f"Uploaded model to {storage.uri}/{S3_KEY}")
 
-    s3 = boto3.client("s3")
-    s3.upload_file(local_model_path, S3_BUCKET, S3_KEY)
-    logging.info(f"Uploaded model to s3://{S3_BUCKET}/{S3_KEY}")
+    meta = dict(meta, params=params, features=list(X_ref.columns),
+                region_categories=list(X_ref["Region"].cat.categories),
+                trained_at=datetime.now().isoformat(timespec="seconds"))
+    save_json_to_s3(meta, S3_BUCKET, META_KEY)
 
-    signature = infer_signature(X_test, y_pred)
+    signature = infer_signature(X_ref, y_pred_ref)
     mlflow.xgboost.log_model(
-        xgb_model=best_model,
+        xgb_model=model,
         artifact_path="xgboost_model",
         signature=signature,
         registered_model_name=REGISTERED_MODEL_NAME
     )
+
+
+def full_train(df):
+    # Rows are stored region by region; order them by period so the test split and the validation
+    # fold of either CV_STRATEGY are the latest periods of every region, not whole unseen regions.
+    df = df.sort_values(["Year", "Month_Num"], kind="stable").reset_index(drop=True)
+
+    X, y = select_features(df)
+    periods = data_periods(df)
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, shuffle=False
+    )
+    train_periods = periods.iloc[:len(X_train)]
+
+
+    with mlflow.start_run(run_name=f"XGBoost_{SEARCH_MODE}") as run:
+        if SEARCH_MODE == "grid":
+            best_model, best_params = grid_search(X_train, y_train, train_periods)
+        elif SEARCH_MODE == "halving":
+            best_model, best_params = halving_search(X_train, y_train, train_periods)
+        else:
+            raise ValueError(f"Unknown SEARCH_MODE '{SEARCH_MODE}', expected 'halving' or 'grid'")
+
+        y_pred = best_model.predict(X_test)
+        r2 = r2_score(y_test, y_pred)
+        mae = mean_absolute_error(y_test, y_pred)
+        mape = mean_absolute_percentage_error(y_test, y_pred)
+
+        mlflow.log_params({"test_size": test_size, "search_mode": SEARCH_MODE, "cv_strategy": CV_STRATEGY})
+        mlflow.log_params(best_params)
+        mlflow.log_metric("r2", r2)
+        mlflow.log_metric("mape", mape)
+        mlflow.log_metric("mae", mae)
+
+        # The test split only scores the search; the published model learns from every row, so
+        # last_period is really the last period it has seen and incremental runs start after it.
+        final_model = make_model({k: v for k, v in best_params.items() if k != "n_estimators"},
+                                 best_params["n_estimators"])
+        final_model.fit(X, y)
+
+        publish_model(final_model, best_params, X_test, final_model.predict(X_test), {
+            "last_period": int(periods.max()),
+            "n_rows": len(df),
+            "val_mae": float(mae),
+            "incremental_updates": 0,
+        })
+
+
+def publish_region_models(results, keys, groups, X_ref, meta):
+    """Save every group model under its own key, with one metadata file routing regions to them."""
+    for group, model, _, _ in results:
+        os.makedirs(os.path.dirname(keys[group]), exist_ok=True)
+        model.save_model(keys[group])
+        get_storage(S3_BUCKET).upload(keys[group], keys[group])
+        mlflow.log_artifact(keys[group], artifact_path="region_models")
+    logging.info(f"Uploaded {len(results)} region models to {get_storage(S3_BUCKET).uri}/"
+                 f"{os.path.dirname(next(iter(keys.values())))}")
+
+    meta = dict(meta, params={group: params for group, _, params, _ in results}, features=list(X_ref.columns),
+                region_categories=list(X_ref["Region"].cat.categories), groups=groups, group_keys=keys,
+                trained_at=datetime.now().isoformat(timespec="seconds"))
+    save_json_to_s3(meta, S3_BUCKET, META_KEY)
+    mlflow.log_dict({"groups": groups, "group_keys": keys}, "region_routing.json")
+
+
+def per_region_train(df):
+    """One budgeted search and model per region group, the groups trained concurrently in a process pool."""
+    df = df.sort_values(["Year", "Month_Num"], kind="stable").reset_index(drop=True)
+    X, y = select_features(df)
+    periods = data_periods(df)
+    clusters = None
+    if REGION_CLUSTERS_PATH:
+        with open(REGION_CLUSTERS_PATH, "r", encoding="utf-8") as f:
+            clusters = json.load(f)
+    groups = region_groups(list(X["Region"].cat.categories), clusters)
+    keys = group_keys(groups)
+
+    # Each group keeps its own chronological test split, so every region is evaluated on its latest periods.
+    tasks, tests = [], []
+    row_group = df["Region"].astype(str).map(groups)
+    for group in sorted(set(groups.values())):
+        rows = (row_group == group).to_numpy()
+        X_train, X_test, y_train, y_test = train_test_split(X[rows], y[rows], test_size=test_size, shuffle=False)
+        train_periods = periods[rows].iloc[:len(X_train)].reset_index(drop=True)
+        folds = make_folds(X_train, train_periods)
+        tasks.append((group, X_train, y_train, folds))
+        tests.append((X_test, y_test))
+
+    search_kwargs = {
+        "n_trials": REGION_SEARCH_MAX_TRIALS,
+        "min_rounds": SEARCH_MIN_ROUNDS,
+        "max_rounds": SEARCH_MAX_ROUNDS,
+        "early_stopping_rounds": EARLY_STOPPING_ROUNDS,
+        "time_budget": REGION_SEARCH_TIME_BUDGET,
+    }
+    with mlflow.start_run(run_name="XGBoost_per_region") as run:
+        start = time.perf_counter()
+        results = train_groups(tasks, search_kwargs, TRAIN_CORES, TRAIN_MAX_WORKERS, TRAIN_MATRIX_CACHE)
+        wall = time.perf_counter() - start
+
+        y_true, y_pred = [], []
+        for (group, model, params, stats), (X_test, y_test) in zip(results, tests):
+            pred = model.predict(X_test)
+            y_true.append(y_test)
+            y_pred.append(pred)
+            with mlflow.start_run(run_name=f"region_{group}", nested=True):
+                mlflow.log_params(dict(params, group=group))
+                mlflow.log_metrics(dict(stats, mae=mean_absolute_error(y_test, pred)))
+        y_true = np.concatenate([np.asarray(y) for y in y_true])
+        y_pred = np.concatenate(y_pred)
+        mae = mean_absolute_error(y_true, y_pred)
+        train_seconds = sum(stats["train_seconds"] for *_, stats in results)
+
+        mlflow.log_params({"test_size": test_size, "cv_strategy": CV_STRATEGY, "n_groups": len(results),
+                           "region_search_max_trials": REGION_SEARCH_MAX_TRIALS,
+                           "region_search_time_budget": REGION_SEARCH_TIME_BUDGET})
+        mlflow.log_metrics({"r2": r2_score(y_true, y_pred), "mae": mae,
+                            "mape": mean_absolute_percentage_error(y_true, y_pred),
+                            "wall_seconds": wall, "parallel_speedup": train_seconds / wall})
+        logging.info(f"Trained {len(results)} group models in {wall:.1f}s ({train_seconds:.1f}s of fits), "
+                     f"test MAE {mae:.5f}")
+
+        publish_region_models(results, keys, groups, X, {
+            "last_period": int(periods.max()),
+            "n_rows": len(df),
+            "val_mae": float(mae),
+            "incremental_updates": 0,
+        })
+
+
+def load_current_model():
+    if MODEL_SOURCE == "mlflow":
+        return mlflow.xgboost.load_model(f"models:/{REGISTERED_MODEL_NAME}/latest")
+    return load_model(S3_BUCKET, S3_KEY)
+
+
+def incremental_train(df):
+    """Continue boosting the current model on periods it has not seen yet.
+
+    Falls back to full_train when there is no usable model, the feature set changed, or the
+    current model's error on the new rows has drifted past INCREMENTAL_DRIFT_THRESHOLD.
+    """
+    try:
+        meta = read_json_from_s3(S3_BUCKET, META_KEY)
+    except Exception as e:
+        logging.warning(f"No current model to continue from ({e}), running a full search")
+        return full_train(df)
+    # Per-region deployments have no global model; keep them per region instead of replacing the routing.
+    if "group_keys" in meta:
+        logging.info("The current model is per region, retraining the region models")
+        return per_region_train(df)
+    try:
+        model = load_current_model()
+    except Exception as e:
+        logging.warning(f"No current model to continue from ({e}), running a full search")
+        return full_train(df)
+
+    X, y = select_features(df, meta["region_categories"])
+    new_rows = (data_periods(df) > meta["last_period"]).values
+    if not new_rows.any():
+        logging.info(f"No periods after {meta['last_period']}, nothing to train")
+        return
+    if list(X.columns) != meta["features"] or X["Region"].isna().any():
+        logging.info("Features or regions changed since the last full training, running a full search")
+        return full_train(df)
+
+    X_new, y_new = X[new_rows], y[new_rows]
+    mae_new = mean_absolute_error(y_new, model.predict(X_new))
+    drift = mae_new / meta["val_mae"] - 1 if meta["val_mae"] else float("inf")
+    logging.info(f"MAE on {len(X_new)} new rows: {mae_new:.5f} (reference {meta['val_mae']:.5f}, drift {drift:+.1%})")
+    if drift > INCREMENTAL_DRIFT_THRESHOLD:
+        logging.info(f"Drift above {INCREMENTAL_DRIFT_THRESHOLD:.0%}, running a full search")
+        return full_train(df)
+
+    params = {k: v for k, v in meta["params"].items() if k != "n_estimators"}
+    updated = make_model(params, INCREMENTAL_ROUNDS)
+    with mlflow.start_run(run_name="XGBoost_incremental") as run:
+        updated.fit(X_new, y_new, xgb_model=model.get_booster())
+        y_pred = updated.predict(X_new)
+
+        mlflow.log_params({"incremental_rounds": INCREMENTAL_ROUNDS, "new_rows": len(X_new),
+                           "from_period": meta["last_period"]})
+        mlflow.log_metrics({"mae_before_update": mae_new, "drift": drift,
+                            "mae_after_update": mean_absolute_error(y_new, y_pred)})
+
+        n_estimators = meta["params"].get("n_estimators", 0) + INCREMENTAL_ROUNDS
+        publish_model(updated, dict(meta["params"], n_estimators=n_estimators), X_new, y_pred, {
+            "last_period": int(data_periods(df).max()),
+            "n_rows": len(df),
+            "val_mae": meta["val_mae"],
+            "incremental_updates": meta.get("incremental_updates", 0) + 1,
+        })
+
+
+def load_store_snapshot():
+    df = pull_store(S3_BUCKET).snapshot(as_of=TRAIN_AS_OF)
+    logging.info(f"Training on the feature store snapshot as of {TRAIN_AS_OF or 'now'} ({len(df)} rows)")
+    return df
+
+
+def load_training_data():
+    """The training frame; with TRAIN_MATRIX_CACHE, read once per data version and then from the local cache."""
+    if DATA_SOURCE == "store":
+        # Only a snapshot at a fixed past TRAIN_AS_OF is immutable, "now" changes with every write.
+        if TRAIN_MATRIX_CACHE and TRAIN_AS_OF:
+            return cached_frame("store", TRAIN_AS_OF, load_store_snapshot)
+        return load_store_snapshot()
+    if DATA_SOURCE == "csv":
+        if TRAIN_MATRIX_CACHE:
+            etag = get_s3_etag(S3_BUCKET, DATA_PATH).strip('"')
+            return cached_frame(DATA_PATH, etag, lambda: read_from_s3(S3_BUCKET, DATA_PATH))
+        return read_from_s3(S3_BUCKET, DATA_PATH)
+    raise ValueError(f"Unknown DATA_SOURCE '{DATA_SOURCE}', expected 'csv' or 'store'")
+
+
+def main():
+    df=load_training_data()
+
+    mlflow.set_experiment(EXPERIMENT_NAME)
+
+    if TRAIN_MODE == "incremental":
+        incremental_train(df)
+    elif TRAIN_MODE == "full":
+        full_train(df)
+    elif TRAIN_MODE == "per_region":
+        per_region_train(df)
+    else:
+        raise ValueError(f"Unknown TRAIN_MODE '{TRAIN_MODE}', expected 'full', 'incremental' or 'per_region'")
+
+
+if __name__ == "__main__":
+    with profiled("train_xgboost"):
+        main()
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from utils.gtfs_utils import Feed, assign_date_windows
+
+
+def window(first, last):
+    return pd.Timestamp(first), pd.Timestamp(last)
+
+
+def windows(feeds):
+    return [(feed.path, feed.window) for feed in feeds]
+
+
+def test_contained_archive_splits_the_older_feed():
+    annual = Feed("default", "annual.zip", window("2024-01-01", "2024-12-31"))
+    summer = Feed("default", "summer.zip", window("2024-07-01", "2024-08-31"))
+    assert windows(assign_date_windows([annual, summer])) == [
+        ("annual.zip", window("2024-01-01", "2024-06-30")),
+        ("summer.zip", window("2024-07-01", "2024-08-31")),
+        ("annual.zip", window("2024-09-01", "2024-12-31")),
+    ]
+
+
+def test_overlapping_archive_takes_the_overlap():
+    old = Feed("default", "old.zip", window("2024-01-01", "2024-06-30"))
+    new = Feed("default", "new.zip", window("2024-05-01", "2024-10-31"))
+    assert windows(assign_date_windows([new, old])) == [
+        ("old.zip", window("2024-01-01", "2024-04-30")),
+        ("new.zip", window("2024-05-01", "2024-10-31")),
+    ]
+
+
+def test_series_are_independent_and_covered_feeds_dropped():
+    replaced = Feed("urban", "replaced.zip", window("2024-01-01", "2024-05-31"))
+    urban = Feed("urban", "urban.zip", window("2024-01-01", "2024-12-31"))
+    extra = Feed("extra", "extra.zip", window("2024-03-01", "2024-03-31"))
+    previous = Feed("urban", "previous.zip", window("2023-06-01", "2024-06-30"))
+    assert windows(assign_date_windows([replaced, urban, extra, previous])) == [
+        ("previous.zip", window("2023-06-01", "2023-12-31")),
+        ("urban.zip", window("2024-01-01", "2024-12-31")),
+        ("extra.zip", window("2024-03-01", "2024-03-31")),
+    ]
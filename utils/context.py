@@ -0,0 +1,66 @@
+import logging
+import os
+import threading
+
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class Context:
+    """Configuration, clients and logging of the pipeline, each set up the first time a stage needs it.
+
+    Nothing happens at construction, so importing a stage is free and every worker process builds
+    its own clients. Tests and benchmarks pass `bucket` instead of setting TOURISM_BUCKET.
+    """
+
+    def __init__(self, bucket=None, log_dir=None):
+        self._bucket = bucket
+        self.log_dir = log_dir or LOG_DIR
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._logging_ready = False
+
+    @property
+    def bucket(self):
+        bucket = self._bucket or os.getenv("TOURISM_BUCKET")
+        if not bucket:
+            raise RuntimeError("TOURISM_BUCKET env var not set (BUCKET_NAME is required)")
+        return bucket
+
+    def client(self, name, factory):
+        """The client called `name`, built once per process with `factory()`."""
+        with self._lock:
+            if name not in self._clients:
+                self._clients[name] = factory()
+            return self._clients[name]
+
+    def setup_logging(self, stage, filename=None):
+        """Log to logs/<stage>.log; the first stage of a run decides, e.g. main_etl for all of its stages."""
+        with self._lock:
+            if self._logging_ready:
+                return
+            filename = filename or os.path.join(self.log_dir, f"{stage}.log")
+            os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+            logging.basicConfig(filename=filename, level=logging.INFO, format=LOG_FORMAT)
+            self._logging_ready = True
+
+
+_context = None
+_context_lock = threading.Lock()
+
+
+def context():
+    """The process-wide Context, created on first use."""
+    global _context
+    with _context_lock:
+        if _context is None:
+            _context = Context()
+        return _context
+
+
+def set_context(ctx):
+    """Replace the process-wide Context (tests, benchmarks) and return the previous one."""
+    global _context
+    with _context_lock:
+        previous, _context = _context, ctx
+        return previous
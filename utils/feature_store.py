@@ -0,0 +1,186 @@
+"""Point-in-time feature store keyed by (region, period), backed by a single SQLite file.
+
+Every write of a feature value that differs from the stored one adds a new version stamped with its
+write time, so a read `as_of` a past time sees exactly the values that existed then. Training reads
+a time-sliced snapshot, inference reads single (region, period) rows through the primary key index.
+"""
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from utils.schema import optimize_dtypes
+from utils.storage import get_storage, is_missing, LocalStorage
+
+FEATURE_STORE_PATH = os.getenv("FEATURE_STORE_PATH", "data/features.db")
+FEATURE_STORE_KEY = os.getenv("FEATURE_STORE_KEY", "feature_store/features.db")
+KEY = ["Region", "period"]
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS features (
+    region TEXT NOT NULL,
+    period INTEGER NOT NULL,
+    feature TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    value,
+    written_at TEXT NOT NULL,
+    PRIMARY KEY (region, period, feature, version)
+);
+CREATE INDEX IF NOT EXISTS features_by_period ON features (period, feature);
+"""
+
+LATEST_SQL = """
+SELECT f.region, f.period, f.feature, f.value FROM features f
+WHERE f.written_at <= :as_of {where}
+AND f.version = (
+    SELECT MAX(g.version) FROM features g
+    WHERE g.region = f.region AND g.period = f.period AND g.feature = f.feature AND g.written_at <= :as_of
+)
+"""
+
+
+def period_of(year, month):
+    """The integer period (YYYYMM) a Year / Month_Num pair is stored under."""
+    return year.astype("int32") * 100 + month
+
+
+def _now():
+    return datetime.now().isoformat(timespec="microseconds")
+
+
+def _as_of(as_of):
+    if as_of is None:
+        return "9999-12-31"
+    return as_of.isoformat() if isinstance(as_of, datetime) else str(as_of)
+
+
+class FeatureStore:
+    def __init__(self, path=FEATURE_STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # One connection per thread, so request threads of the prediction service can share the store.
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._connection().executescript(SCHEMA_SQL)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path)
+        return conn
+
+    def upsert(self, df, features=None, written_at=None):
+        """Write the features of `df` (keyed by Region, period); only values that changed get a new version."""
+        features = features or [col for col in df.columns if col not in KEY]
+        df = df.drop_duplicates(KEY, keep="last")
+        long = df.melt(id_vars=KEY, value_vars=features, var_name="feature", value_name="value")
+        long["region"] = long["Region"].astype(str)
+        long["period"] = long["period"].astype("int64")
+        long["value"] = long["value"].astype(object).where(long["value"].notna(), None)
+        rows = [
+            (region, int(period), feature, value.item() if hasattr(value, "item") else value)
+            for region, period, feature, value in long[["region", "period", "feature", "value"]].itertuples(index=False)
+        ]
+
+        with self._write_lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS staging (region TEXT, period INTEGER, feature TEXT, value)")
+                conn.execute("DELETE FROM staging")
+                conn.executemany("INSERT INTO staging VALUES (?, ?, ?, ?)", rows)
+                before = conn.total_changes
+                conn.execute("""
+                    WITH latest AS (
+                        SELECT region, period, feature, MAX(version) AS version
+                        FROM features GROUP BY region, period, feature
+                    )
+                    INSERT INTO features (region, period, feature, version, value, written_at)
+                    SELECT s.region, s.period, s.feature, COALESCE(l.version, 0) + 1, s.value, ?
+                    FROM staging s
+                    LEFT JOIN latest l ON l.region = s.region AND l.period = s.period AND l.feature = s.feature
+                    LEFT JOIN features f ON f.region = s.region AND f.period = s.period
+                        AND f.feature = s.feature AND f.version = l.version
+                    WHERE l.version IS NULL OR f.value IS NOT s.value
+                """, (written_at or _now(),))
+                written = conn.total_changes - before
+        logging.info(f"Feature store {self.path}: {len(rows)} values upserted, {written} new versions")
+        return written
+
+    def _read(self, features=None, as_of=None, where="", params=None):
+        params = dict(params or {}, as_of=_as_of(as_of))
+        if features:
+            names = {f"f{i}": name for i, name in enumerate(features)}
+            where += f" AND f.feature IN ({', '.join(':' + key for key in names)})"
+            params.update(names)
+        long = pd.read_sql_query(LATEST_SQL.format(where=where), self._connection(), params=params)
+        columns = KEY + list(features or sorted(long["feature"].unique()))
+        if long.empty:
+            return pd.DataFrame(columns=columns)
+        wide = (
+            long.pivot(index=["region", "period"], columns="feature", values="value")
+            .reset_index()
+            .rename(columns={"region": "Region"})
+            .rename_axis(columns=None)
+        )
+        for col in wide.columns.difference(KEY):
+            converted = pd.to_numeric(wide[col], errors="coerce")
+            if converted.notna().sum() == wide[col].notna().sum():
+                wide[col] = converted
+        return optimize_dtypes(wide.reindex(columns=columns))
+
+    def snapshot(self, features=None, as_of=None, start=None, end=None):
+        """Every (Region, period) row as it was at `as_of` (default: now), limited to periods start..end."""
+        where, params = "", {}
+        if start is not None:
+            where += " AND f.period >= :start"
+            params["start"] = int(start)
+        if end is not None:
+            where += " AND f.period <= :end"
+            params["end"] = int(end)
+        return self._read(features, as_of, where, params).sort_values(KEY, ignore_index=True)
+
+    def lookup(self, keys, features=None, as_of=None):
+        """The rows of the given (region, period) keys, each read through the primary key index."""
+        frames = [
+            self._read(features, as_of, " AND f.region = :region AND f.period = :period",
+                       {"region": region, "period": int(period)})
+            for region, period in keys
+        ]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=KEY + list(features or []))
+
+    def history(self, region, period, feature):
+        """Every stored version of one feature value."""
+        return pd.read_sql_query(
+            "SELECT version, value, written_at FROM features WHERE region = ? AND period = ? AND feature = ? "
+            "ORDER BY version",
+            self._connection(), params=(region, int(period), feature),
+        )
+
+
+def pull_store(bucket_name, key=FEATURE_STORE_KEY, path=FEATURE_STORE_PATH):
+    """Download the store from the bucket (starting an empty one when there is none yet) and open it.
+
+    Only a missing key starts an empty store; any other failure is raised, so a stale or empty local
+    file is never pushed back over the stored history.
+    """
+    storage = get_storage(bucket_name)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    in_place = isinstance(storage, LocalStorage) and storage.path(key) == os.path.abspath(path)
+    if not in_place and os.path.exists(path):
+        os.remove(path)
+    try:
+        storage.download(key, path)
+    except Exception as e:
+        if not is_missing(e):
+            raise
+        logging.info(f"No feature store at {storage.uri}/{key}, starting an empty one at {path}")
+    return FeatureStore(path)
+
+
+def push_store(store, bucket_name, key=FEATURE_STORE_KEY):
+    storage = get_storage(bucket_name)
+    storage.upload(store.path, key)
+    logging.info(f"Uploaded feature store to {storage.uri}/{key}")
@@ -0,0 +1,70 @@
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from xgboost import XGBRegressor
+
+from utils.storage import get_storage
+
+
+def load_model(bucket_name, key, local_path="models/xgb.pkl"):
+    """Download the model train_xgboost.py published and load it once."""
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    get_storage(bucket_name).download(key, local_path)
+    model = XGBRegressor()
+    model.load_model(local_path)
+    return model
+
+
+def load_predictor(bucket_name, key, meta):
+    """The published predictor: the global model, or a RegionRouter over the per-region models."""
+    if "group_keys" not in meta:
+        return load_model(bucket_name, key)
+    from utils.region_models import RegionRouter
+    keys = meta["group_keys"]
+    return RegionRouter(meta["groups"], meta["region_categories"], meta["features"],
+                        lambda group: load_model(bucket_name, keys[group], keys[group]))
+
+
+def upcoming_weeks(n_weeks, today=None):
+    """The next `n_weeks` ISO weeks after the current one, with the month each week falls in."""
+    today = today or date.today()
+    next_monday = today + timedelta(days=7 - today.weekday())
+    mondays = pd.date_range(next_monday, periods=n_weeks, freq="W-MON")
+    iso = mondays.isocalendar()
+    return pd.DataFrame({
+        "year": iso["year"].values.astype(int),
+        "week": iso["week"].values.astype(int),
+        # ISO weeks belong to the month of their Thursday.
+        "Month_Num": (mondays + pd.Timedelta(days=3)).month.values,
+    })
+
+
+def as_region_category(regions, categories):
+    """Region as the categorical the model was trained with; regions outside `categories` become NaN."""
+    return pd.Categorical(regions, categories=categories)
+
+
+def region_month_profile(df, features):
+    """Mean of every numeric model feature per region and month over the whole history."""
+    numeric = [col for col in features if col not in ("Month_Num", "Region")]
+    profile = (
+        df.groupby(["Region", "Month_Num"], observed=True)[numeric]
+        .mean()
+        .reset_index()
+    )
+    profile["Region"] = profile["Region"].astype(str)
+    return profile
+
+
+def build_forecast_frame(profile, weeks):
+    """Every region x upcoming week with the region's profile for that week's month, in one merge."""
+    regions = pd.DataFrame({"Region": profile["Region"].unique()})
+    grid = regions.merge(weeks, how="cross")
+    return grid.merge(profile, on=["Region", "Month_Num"], how="left")
+
+
+def predict_tourism_index(model, frame, features, categories):
+    X = frame[features].assign(Region=as_region_category(frame["Region"], categories))
+    return np.clip(model.predict(X), 0, 1)
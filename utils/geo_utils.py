@@ -0,0 +1,51 @@
+import json
+import logging
+
+import geopandas as gpd
+import shapely
+
+from utils.gtfs_utils import normalize_text
+
+# Simplification tolerance in degrees per zoom level (0.001° is roughly 80-110 m in Trentino).
+ZOOM_TOLERANCES = {"low": 0.01, "medium": 0.003, "high": 0.0008}
+# Coordinates are snapped to this grid (~1 m) before publishing, which keeps the GeoJSON short.
+GRID_SIZE = 1e-5
+
+
+def dissolve_regions(comuni, comune_to_region):
+    """One (multi)polygon per tourism region: the union of its comuni, in EPSG:4326."""
+    comuni = comuni.to_crs("EPSG:4326")
+    comuni = comuni.assign(
+        tourism_region=comuni["COMUNE"].apply(normalize_text).map(comune_to_region),
+        geometry=shapely.make_valid(comuni.geometry.values),
+    )
+    unmapped = comuni["tourism_region"].isna()
+    if unmapped.any():
+        logging.warning(f"{unmapped.sum()} comuni have no tourism region and are left off the map")
+    return comuni[~unmapped].dissolve(by="tourism_region", as_index=False)[["tourism_region", "geometry"]]
+
+
+def simplify_regions(regions, tolerance):
+    """Simplify region outlines while neighbours keep sharing the same edges (no gaps or overlaps).
+
+    Uses shapely's coverage simplification (shapely >= 2.1); older versions fall back to simplifying
+    each region on its own with preserve_topology, which can open thin slivers along borders.
+    """
+    if hasattr(shapely, "coverage_simplify"):
+        geometry = shapely.coverage_simplify(regions.geometry.values, tolerance)
+    else:
+        geometry = regions.geometry.simplify(tolerance, preserve_topology=True).values
+    geometry = shapely.set_precision(geometry, GRID_SIZE)
+    return regions.assign(geometry=geometry)
+
+
+def region_geometries(comuni, comune_to_region, tolerances=ZOOM_TOLERANCES):
+    """GeoJSON FeatureCollection of the tourism regions for every zoom level."""
+    regions = dissolve_regions(comuni, comune_to_region).rename(columns={"tourism_region": "Region"})
+    levels = {}
+    for level, tolerance in tolerances.items():
+        simplified = simplify_regions(regions, tolerance)
+        levels[level] = json.loads(gpd.GeoDataFrame(simplified, crs="EPSG:4326").to_json(drop_id=True))
+        logging.info(f"Region geometries '{level}': {shapely.get_num_coordinates(simplified.geometry.values).sum()} "
+                     f"vertices (tolerance {tolerance})")
+    return levels
@@ -0,0 +1,149 @@
+"""The GTFS aggregations of gtfs_etl as SQL over the feed's text files, run by DuckDB.
+
+trips, stop_times and the expanded service days never become pandas frames: DuckDB scans the
+files in parallel and spills joins and aggregations to disk past its memory limit. Only the small
+tables (merged calendar, stop -> region) are passed in from pandas. Results match the pandas path.
+"""
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from contextlib import contextmanager
+
+import pandas as pd
+
+from utils.gtfs_utils import WEEKDAYS, HOUR_BAND_EDGES, HOUR_BANDS
+
+DUCKDB_MEMORY_LIMIT = os.getenv("DUCKDB_MEMORY_LIMIT", "2GB")
+DUCKDB_TEMP_DIR = os.getenv("DUCKDB_TEMP_DIR", ".duckdb_tmp")
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", "0")) or os.cpu_count()
+
+# Same rules as expand_dates: a service runs on every date of its range whose weekday flag is 1
+# (isodow: Monday == 1); rows without dates or flags (seasonal calendar_dates services) never run.
+SERVICE_DAYS_SQL = f"""
+SELECT DISTINCT c.service_id, CAST(d AS DATE) AS date
+FROM calendar c, generate_series(c.start_date, c.end_date, INTERVAL 1 DAY) AS g(d)
+WHERE c.start_date IS NOT NULL AND c.end_date IS NOT NULL
+AND CASE isodow(d) {' '.join(f'WHEN {i + 1} THEN c.{day}' for i, day in enumerate(WEEKDAYS))} END = 1
+{{window}}
+"""
+
+HOUR_BAND_SQL = "CASE " + " ".join(
+    f"WHEN hour < {edge} THEN '{band}'" for edge, band in zip(HOUR_BAND_EDGES, HOUR_BANDS)
+) + f" ELSE '{HOUR_BANDS[-1]}' END"
+
+QUERIES = {
+    # Distinct (region, month, trip): a trip counts once per region it stops in.
+    "trip_months": """
+        SELECT DISTINCT r.tourism_region, date_trunc('month', d.date) AS date, r.trip_id
+        FROM trip_days d JOIN trip_regions r USING (trip_id)
+    """,
+    "daily_trips": """
+        SELECT r.tourism_region, CAST(d.date AS TIMESTAMP) AS date, COUNT(DISTINCT r.trip_id) AS num_trips
+        FROM trip_days d JOIN trip_regions r USING (trip_id)
+        GROUP BY ALL
+    """,
+    "departures": f"""
+        WITH per_service AS (
+            SELECT t.service_id, s.tourism_region, {HOUR_BAND_SQL} AS hour_band, COUNT(*) AS n
+            FROM (
+                SELECT trip_id, stop_id,
+                       TRY_CAST(split_part(departure_time, ':', 1) AS INTEGER) % 24 AS hour
+                FROM stop_times
+            ) st
+            JOIN trips t USING (trip_id)
+            JOIN first_stops s USING (stop_id)
+            WHERE st.hour IS NOT NULL AND s.tourism_region <> 'Unknown'
+            GROUP BY ALL
+        )
+        SELECT p.tourism_region, CAST(d.date AS TIMESTAMP) AS date, p.hour_band, CAST(SUM(p.n) AS BIGINT) AS num_departures
+        FROM per_service p JOIN service_days d USING (service_id)
+        GROUP BY ALL
+    """,
+}
+
+
+UNITS = {"": 1, "B": 1, "KB": 10**3, "MB": 10**6, "GB": 10**9, "TB": 10**12,
+         "KIB": 2**10, "MIB": 2**20, "GIB": 2**30, "TIB": 2**40}
+
+
+def worker_share(workers, memory_limit=DUCKDB_MEMORY_LIMIT, threads=DUCKDB_THREADS):
+    """(memory_limit, threads) of one of `workers` concurrent connections, so that together they stay
+    within DUCKDB_MEMORY_LIMIT and DUCKDB_THREADS (like plan_cores does for training)."""
+    match = re.fullmatch(r"\s*([\d.]+)\s*([a-zA-Z]*)\s*", memory_limit)
+    if match is None or match.group(2).upper() not in UNITS:
+        raise ValueError(f"Cannot parse DUCKDB_MEMORY_LIMIT '{memory_limit}', expected e.g. '2GB'")
+    total = float(match.group(1)) * UNITS[match.group(2).upper()]
+    return f"{max(1, int(total / workers / 10**6))}MB", max(1, int(threads) // workers)
+
+
+def connect(memory_limit=DUCKDB_MEMORY_LIMIT, temp_dir=DUCKDB_TEMP_DIR, threads=DUCKDB_THREADS):
+    import duckdb
+    os.makedirs(temp_dir, exist_ok=True)
+    con = duckdb.connect()
+    con.execute(f"SET memory_limit = '{memory_limit}'")
+    con.execute(f"SET temp_directory = '{temp_dir}'")
+    con.execute(f"SET threads = {int(threads)}")
+    con.execute("SET preserve_insertion_order = false")
+    return con
+
+
+@contextmanager
+def feed_files(path, names=("trips.txt", "stop_times.txt")):
+    """Paths DuckDB can scan for the given files of a feed directory or .zip archive."""
+    if not str(path).endswith(".zip"):
+        yield {name: os.path.join(path, name) for name in names}
+        return
+    tmp = tempfile.mkdtemp(prefix="gtfs_")
+    try:
+        with zipfile.ZipFile(path) as archive:
+            yield {name: archive.extract(name, tmp) for name in names}
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def feed_aggregates(path, calendar, stop_regions, date_window=None, con=None):
+    """(trip_months, daily_trips, departures) of one feed, in the layout of the pandas path.
+
+    `calendar` is the merged calendar (merge_calendar_and_exceptions), `stop_regions` maps stop_id to
+    tourism_region, `date_window` optionally limits the service dates to (first, last).
+    """
+    con = con or connect()
+    calendar = calendar.assign(service_id=calendar["service_id"].astype(str))
+    for day in WEEKDAYS:
+        if day not in calendar.columns:
+            calendar[day] = pd.NA
+    stops = stop_regions[["stop_id", "tourism_region"]].assign(stop_id=stop_regions["stop_id"].astype(str))
+
+    window = ""
+    if date_window is not None:
+        first, last = (pd.Timestamp(d).date() for d in date_window)
+        window = f"AND CAST(d AS DATE) BETWEEN DATE '{first}' AND DATE '{last}'"
+
+    with feed_files(path) as files:
+        con.register("calendar", calendar[["service_id", "start_date", "end_date"] + WEEKDAYS])
+        con.register("stops", stops)
+        # A stop inside two polygons gives its trip both regions, but its departures count once (as in daily_departures).
+        con.register("first_stops", stops.drop_duplicates("stop_id"))
+        # Ids are read as text on both sides so they join whatever their format.
+        con.execute(f"CREATE OR REPLACE TEMP VIEW trips AS SELECT * FROM read_csv('{files['trips.txt']}', all_varchar=true, header=true)")
+        con.execute(f"CREATE OR REPLACE TEMP VIEW stop_times AS SELECT * FROM read_csv('{files['stop_times.txt']}', all_varchar=true, header=true)")
+        con.execute(f"CREATE OR REPLACE TEMP TABLE service_days AS {SERVICE_DAYS_SQL.format(window=window)}")
+        con.execute("""
+            CREATE OR REPLACE TEMP TABLE trip_days AS
+            SELECT t.trip_id, d.date FROM trips t JOIN service_days d USING (service_id)
+        """)
+        con.execute("""
+            CREATE OR REPLACE TEMP TABLE trip_regions AS
+            SELECT DISTINCT st.trip_id, s.tourism_region
+            FROM stop_times st JOIN stops s USING (stop_id)
+            WHERE s.tourism_region IS NOT NULL AND s.tourism_region <> 'Unknown'
+        """)
+        results = {name: con.execute(sql).df() for name, sql in QUERIES.items()}
+
+    trip_months, daily_trips, departures = results["trip_months"], results["daily_trips"], results["departures"]
+    trip_months["date"] = pd.to_datetime(trip_months["date"]).dt.to_period("M")
+    for df in (daily_trips, departures):
+        df["date"] = df["date"].astype("datetime64[ns]")
+    return trip_months, daily_trips, departures
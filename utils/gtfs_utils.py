@@ -1,5 +1,21 @@
+import os
+import json
+import zipfile
+from collections import namedtuple
+
+import numpy as np
 import pandas as pd
 
+# One GTFS feed: its series (network) name, directory or .zip path, and the (first, last) service dates it owns.
+Feed = namedtuple("Feed", ["series", "path", "window"])
+
+COMUNE_MAP_PATH = "utils/comune_to_region_map.json"
+
+def load_comune_map(path=COMUNE_MAP_PATH):
+    """comune name -> tourism region."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
 def normalize_text(text):
     if isinstance(text, str):
         for enc in ("latin1", "cp1252"):
@@ -29,16 +45,167 @@ def merge_calendar_and_exceptions(calendar, calendar_dates):
 
     calendar = pd.concat([calendar, seasonal_services], ignore_index=True).drop(columns=["exception_type"])
     return calendar
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
 def expand_dates(df):
-    expanded_rows = []
-   
-    for _, row in df.iterrows():
-        start_date = row["start_date"]
-        end_date = row["end_date"]
-        for single_date in pd.date_range(start_date, end_date):
-            weekday_name = single_date.strftime("%A").lower()
-            if row.get(weekday_name, 0) == 1:
-                new_row = row.copy()
-                new_row["date"] = single_date
-                expanded_rows.append(new_row)
-    return pd.DataFrame(expanded_rows)
\ No newline at end of file
+    """One row per service day: every date between start_date and end_date whose weekday flag is 1."""
+    df = df[df["start_date"].notna() & df["end_date"].notna()]
+    start = df["start_date"].values.astype("datetime64[D]")
+    end = df["end_date"].values.astype("datetime64[D]")
+    lengths = np.maximum((end - start).astype(np.int64) + 1, 0)
+
+    row_idx = np.repeat(np.arange(len(df)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    dates = start[row_idx] + offsets.astype("timedelta64[D]")
+    # 1970-01-01 was a Thursday, so Monday == 0 like the WEEKDAYS order.
+    weekday = (dates.astype(np.int64) + 3) % 7
+
+    flags = np.column_stack([
+        (df[day] == 1).to_numpy() if day in df.columns else np.zeros(len(df), dtype=bool)
+        for day in WEEKDAYS
+    ])
+    keep = flags[row_idx, weekday]
+
+    expanded = df.iloc[row_idx[keep]].reset_index(drop=True)
+    expanded["date"] = pd.to_datetime(dates[keep])
+    return expanded
+
+def parse_feeds(spec, default_series="default"):
+    """Feeds from "path,series=path,..."; paths without a series belong to `default_series`."""
+    feeds = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        series, _, path = entry.rpartition("=")
+        feeds.append(Feed(series.strip() or default_series, path.strip(), None))
+    return feeds
+
+def feed_reader(path):
+    """read(name) -> DataFrame for a file of a GTFS feed directory or .zip archive."""
+    if str(path).endswith(".zip"):
+        def read(name):
+            with zipfile.ZipFile(path) as archive, archive.open(name) as f:
+                return pd.read_csv(f)
+        return read
+    return lambda name: pd.read_csv(os.path.join(path, name))
+
+def feed_date_range(path):
+    """First and last service date of a feed, from its calendar files only."""
+    read = feed_reader(path)
+    calendar = merge_calendar_and_exceptions(read("calendar.txt"), read("calendar_dates.txt"))
+    return calendar["start_date"].min(), calendar["end_date"].max()
+
+def assign_date_windows(feeds):
+    """Split the windows of feeds in the same series so each date belongs to the newest feed covering it.
+
+    Newer means a later first service date (later in the list on a tie). An older feed keeps the dates
+    before and after a newer one, so it can come back as several feeds with one window each; feeds
+    left with no dates are dropped.
+    """
+    day = pd.Timedelta(days=1)
+    assigned = []
+    for series in dict.fromkeys(feed.series for feed in feeds):
+        group = [feed for feed in feeds if feed.series == series]
+        newest_first = sorted(range(len(group)), key=lambda i: (group[i].window[0], i), reverse=True)
+        taken = []
+        pieces = []
+        for i in newest_first:
+            free = [group[i].window]
+            for taken_start, taken_end in taken:
+                free = [
+                    piece
+                    for start, end in free
+                    for piece in ((start, min(end, taken_start - day)), (max(start, taken_end + day), end))
+                    if piece[1] >= piece[0]
+                ]
+            taken.append(group[i].window)
+            pieces.extend(group[i]._replace(window=window) for window in free)
+        assigned.extend(sorted(pieces, key=lambda feed: feed.window[0]))
+    return assigned
+
+def merge_geo_data(boxes):
+    """Union of per-region stop bounding boxes from several feeds."""
+    merged = {}
+    for geo_data in boxes:
+        for region, box in geo_data.items():
+            if region not in merged:
+                merged[region] = dict(box)
+                continue
+            current = merged[region]
+            for key in ("min_lon", "min_lat"):
+                current[key] = min(current[key], box[key])
+            for key in ("max_lon", "max_lat"):
+                current[key] = max(current[key], box[key])
+    return merged
+
+# Hour bands a departure falls in, split at these hours: night < 6 <= morning < 10 <= daytime < 16 <= evening < 20 <= late.
+HOUR_BAND_EDGES = [6, 10, 16, 20]
+HOUR_BANDS = ["night", "morning", "daytime", "evening", "late"]
+
+def departure_hours(times):
+    """Hour of GTFS H:MM:SS times folded into 0-23 (trips after midnight run past 24:00); -1 when missing."""
+    hours = pd.to_numeric(times.astype("string").str.split(":", n=1).str[0], errors="coerce")
+    return np.where(hours.isna(), -1, hours.fillna(0).to_numpy(np.int64) % 24)
+
+def daily_departures(stop_times, trips, calendar, stop_regions, date_window=None, day_chunk=31):
+    """Departures per tourism region, service date and hour band: every stop_time of every trip running that day.
+
+    Ids are turned into integer codes and the stop_times reduced with np.bincount to a service x
+    (region, hour band) count matrix. That matrix is multiplied by the day x service activity of
+    `day_chunk` days at a time, so the stop_time x day events are never materialised. `calendar` is
+    the merged calendar, `stop_regions` maps stop_id to tourism_region ("Unknown" is skipped).
+    """
+    stop_regions = stop_regions.drop_duplicates("stop_id")
+    service_codes, services = pd.factorize(trips["service_id"])
+    region_codes, regions = pd.factorize(stop_regions["tourism_region"])
+    region_codes = np.where(np.asarray(regions)[region_codes] == "Unknown", -1, region_codes)
+    n_bands = len(HOUR_BANDS)
+    n_cells = len(regions) * n_bands
+
+    trip_pos = pd.Index(trips["trip_id"]).get_indexer(stop_times["trip_id"])
+    stop_pos = pd.Index(stop_regions["stop_id"]).get_indexer(stop_times["stop_id"])
+    hours = departure_hours(stop_times["departure_time"])
+    service = np.where(trip_pos >= 0, service_codes[trip_pos], -1)
+    region = np.where(stop_pos >= 0, region_codes[stop_pos], -1)
+    valid = (service >= 0) & (region >= 0) & (hours >= 0)
+    cell = region[valid] * n_bands + np.digitize(hours[valid], HOUR_BAND_EDGES)
+    per_service = np.bincount(
+        service[valid] * n_cells + cell, minlength=len(services) * n_cells
+    ).reshape(len(services), n_cells).astype(np.float64)
+
+    active = expand_dates(calendar[calendar["service_id"].isin(services)])
+    if date_window is not None:
+        active = active[active["date"].between(*date_window)]
+    columns = ["tourism_region", "date", "hour_band", "num_departures"]
+    if active.empty:
+        # Typed like a non-empty result, so callers can still use .dt on a feed without active services.
+        return pd.DataFrame({
+            "tourism_region": pd.Series(dtype=object),
+            "date": pd.Series(dtype="datetime64[ns]"),
+            "hour_band": pd.Series(dtype=object),
+            "num_departures": pd.Series(dtype=np.int64),
+        })
+    dates = active["date"].values.astype("datetime64[D]")
+    first = dates.min()
+    day = (dates - first).astype(np.int64)
+    service_pos = pd.Index(services).get_indexer(active["service_id"])
+    order = np.argsort(day, kind="stable")
+    day, service_pos = day[order], service_pos[order]
+    n_days = int(day[-1]) + 1
+
+    frames = []
+    for lo in range(0, n_days, day_chunk):
+        hi = min(lo + day_chunk, n_days)
+        a, b = np.searchsorted(day, [lo, hi])
+        activity = np.zeros((hi - lo, len(services)))
+        activity[day[a:b] - lo, service_pos[a:b]] = 1
+        counts = activity @ per_service
+        rows, cols = np.nonzero(counts)
+        frames.append(pd.DataFrame({
+            "tourism_region": np.asarray(regions)[cols // n_bands],
+            "date": pd.to_datetime(first + (lo + rows).astype("timedelta64[D]")),
+            "hour_band": np.asarray(HOUR_BANDS)[cols % n_bands],
+            "num_departures": counts[rows, cols].astype(np.int64),
+        }))
+    return pd.concat(frames, ignore_index=True)[columns]
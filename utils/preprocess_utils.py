@@ -1,5 +1,7 @@
+import numpy as np
 import pandas as pd
 from utils.s3_utils import save_to_s3,read_from_s3
+from utils.schema import optimize_dtypes
 
 def merge_weather_tourism(tourism_path,bucket_name):
     tourism=read_from_s3(bucket_name,tourism_path)
@@ -21,7 +23,7 @@ def merge_weather_tourism(tourism_path,bucket_name):
             final_df["Total_presence"]=final_df["Italians"]+final_df["Foreigners"]
             
 
-    return final_df
+    return optimize_dtypes(final_df, label="merge_weather_tourism")
 
 def get_season(month):
     if month in [12, 1, 2]:
@@ -65,6 +67,38 @@ def compute_weather_score(row,scaling_params,n_days=30):
         
     return max(0, min(1, score))
 
+# Inputs of compute_weather_score besides the season.
+WEATHER_INPUTS = ["temperature_2m_mean", "rainy_day", "snowfall_sum", "snowy_day", "cloud_cover_mean", "wind_speed_10m_max"]
+SEASON_BY_MONTH = np.array([None] + [get_season(month) for month in range(1, 13)], dtype=object)
+
+def compute_weather_scores(data, scaling_params, n_days=30):
+    """compute_weather_score for whole columns at once: `data` is a DataFrame or a dict of arrays with
+    the WEATHER_INPUTS and either "season" or "Month_Num"."""
+    t = np.asarray(data["temperature_2m_mean"], dtype=np.float64)
+    rainy_days = np.asarray(data["rainy_day"], dtype=np.float64)
+    snow = np.asarray(data["snowfall_sum"], dtype=np.float64)
+    snowy_days = np.asarray(data["snowy_day"], dtype=np.float64)
+    cloud = np.asarray(data["cloud_cover_mean"], dtype=np.float64)
+    wind = np.asarray(data["wind_speed_10m_max"], dtype=np.float64)
+    if "season" in data:
+        season = np.asarray(data["season"], dtype=object)
+    else:
+        season = SEASON_BY_MONTH[np.asarray(data["Month_Num"], dtype=np.int64)]
+    max_snow = (scaling_params["max_snowfall_sum"] / 30) * n_days
+    max_wind = scaling_params["max_wind_speed"]
+
+    score = np.select(
+        [season == "summer", season == "winter"],
+        [
+            0.5 * (1 - np.abs(t - 25) / 25) + 0.3 * (1 - rainy_days / n_days) + 0.2 * (1 - cloud / 100),
+            0.45 * (1 - np.abs(t + 2) / 15) + 0.4 * (snow / max_snow) + 0.15 * (1 - wind / max_wind)
+            + 0.05 * (snowy_days / n_days),
+        ],
+        default=0.5 * (1 - np.abs(t - 18) / 18) + 0.3 * (1 - rainy_days / n_days) + 0.2 * (1 - cloud / 100),
+    )
+    # max(0, min(1, nan)) is 1 in the scalar version; keep that so both give the same scores.
+    return np.clip(np.nan_to_num(score, nan=1.0), 0, 1)
+
 def categorize_experience(score):
     if score < 0.1:
         return "Not Ideal"
@@ -75,4 +109,30 @@ def categorize_experience(score):
     elif score < 0.75:
         return "Popular Season"
     else:
-        return "Peak Season"
\ No newline at end of file
+        return "Peak Season"
+
+EXPERIENCE_BINS = [0.1, 0.4, 0.6, 0.75]
+EXPERIENCE_LEVELS = ["Not Ideal", "Quiet Season", "Moderate Season", "Popular Season", "Peak Season"]
+
+def categorize_experience_array(scores):
+    """Vectorized categorize_experience for a whole array or Series of scores."""
+    return np.array(EXPERIENCE_LEVELS)[np.digitize(scores, EXPERIENCE_BINS)]
+
+def insight_cube(df, by):
+    """tourism_index mean/min/max/count and the majority experience_level per Region x `by` (e.g. Month_Num, season)."""
+    keys = ["Region", by]
+    stats = (
+        df.groupby(keys, observed=True)["tourism_index"]
+        .agg(["mean", "min", "max", "count"])
+        .add_prefix("tourism_index_")
+    )
+    majority = (
+        df.groupby(keys + ["experience_level"], observed=True)
+        .size()
+        .rename("n")
+        .reset_index()
+        .sort_values(keys + ["n"], ascending=[True, True, False], kind="stable")
+        .drop_duplicates(keys)
+        .set_index(keys)["experience_level"]
+    )
+    return stats.join(majority).reset_index()
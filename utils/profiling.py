@@ -0,0 +1,142 @@
+import cProfile
+import collections
+import contextlib
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from datetime import datetime
+
+# PROFILE=sample|cprofile (or --profile[=mode] on the command line) turns profiling on.
+PROFILE_MODE = os.getenv("PROFILE", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "logs")
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "30"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+
+
+def profile_mode(argv=None):
+    """Return the requested profiler ("sample", "cprofile") or None when profiling is off."""
+    argv = sys.argv[1:] if argv is None else argv
+    mode = PROFILE_MODE
+    for arg in argv:
+        if arg == "--profile":
+            mode = mode or "sample"
+        elif arg.startswith("--profile="):
+            mode = arg.split("=", 1)[1]
+    mode = mode.strip().lower()
+    if mode in ("", "0", "off", "false", "none"):
+        return None
+    if mode in ("1", "on", "true"):
+        return "sample"
+    if mode not in ("sample", "cprofile"):
+        raise ValueError(f"Unknown profiler '{mode}', expected 'sample' or 'cprofile'")
+    return mode
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread at a fixed interval and aggregates folded stacks."""
+
+    def __init__(self, interval=PROFILE_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write_folded(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def summary(self, top_n=PROFILE_TOP_N):
+        own = collections.Counter()
+        total = collections.Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for name in set(frames):
+                total[name] += count
+        lines = [f"{self.samples} samples every {self.interval * 1000:.1f} ms", "",
+                 f"{'self%':>7} {'total%':>7}  function"]
+        for name, count in own.most_common(top_n):
+            lines.append(f"{100 * count / self.samples:7.2f} {100 * total[name] / self.samples:7.2f}  {name}")
+        return "\n".join(lines) + "\n"
+
+
+def _write_cprofile_folded(stats, path):
+    """Approximate folded stacks from cProfile caller edges, one line per caller -> callee pair."""
+    with open(path, "w", encoding="utf-8") as f:
+        for func, (_, _, tottime, _, callers) in stats.stats.items():
+            callee = f"{func[2]} ({os.path.basename(func[0])}:{func[1]})"
+            if not callers:
+                f.write(f"{callee} {int(tottime * 1e6)}\n")
+                continue
+            for caller, (_, _, caller_tottime, _) in callers.items():
+                name = f"{caller[2]} ({os.path.basename(caller[0])}:{caller[1]})"
+                f.write(f"{name};{callee} {int(caller_tottime * 1e6)}\n")
+
+
+@contextlib.contextmanager
+def profiled(stage, mode=None):
+    """Run the enclosed block under a profiler when PROFILE / --profile is set, else do nothing."""
+    mode = mode or profile_mode()
+    if mode is None:
+        yield
+        return
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    prefix = os.path.join(PROFILE_DIR, f"profile_{stage}_{datetime.now():%Y%m%d_%H%M%S}")
+    start = time.perf_counter()
+
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(f"{prefix}.prof")
+            buffer = io.StringIO()
+            stats = pstats.Stats(profiler, stream=buffer)
+            stats.sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+            with open(f"{prefix}.txt", "w", encoding="utf-8") as f:
+                f.write(buffer.getvalue())
+            _write_cprofile_folded(stats, f"{prefix}.folded")
+            logging.info(f"Profiled {stage} in {time.perf_counter() - start:.2f}s -> {prefix}.*")
+    else:
+        profiler = SamplingProfiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            profiler.write_folded(f"{prefix}.folded")
+            with open(f"{prefix}.txt", "w", encoding="utf-8") as f:
+                f.write(profiler.summary())
+            logging.info(f"Profiled {stage} in {time.perf_counter() - start:.2f}s -> {prefix}.*")
@@ -0,0 +1,109 @@
+"""One model per tourism region (or cluster of regions), trained in parallel processes and served
+behind a RegionRouter that dispatches each row to the model of its region."""
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.train_utils import successive_halving_search, make_model, plan_cores
+from utils.train_matrix import MatrixCache, fit_cached
+
+REGION_MODELS_PREFIX = "models/regions"
+
+
+def region_groups(regions, clusters=None):
+    """region -> group: its cluster in `clusters` ({cluster: [regions]}), otherwise the region itself."""
+    groups = {region: region for region in regions}
+    for cluster, members in (clusters or {}).items():
+        for region in members:
+            if region in groups:
+                groups[region] = cluster
+    return groups
+
+
+def group_keys(groups, prefix=REGION_MODELS_PREFIX):
+    """group -> model key; the position keeps keys unique when two names slugify alike."""
+    names = sorted(set(groups.values()))
+    return {
+        name: f"{prefix}/{i:03d}_{re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')}.json"
+        for i, name in enumerate(names)
+    }
+
+
+def train_group(group, X_train, y_train, folds, search_kwargs, n_jobs, cache_matrices=False):
+    """Budgeted successive-halving search for one group, then a refit on all of its training rows."""
+    start = time.perf_counter()
+    # Matrices hold native handles, so each worker process builds its own.
+    matrices = MatrixCache(X_train, y_train) if cache_matrices else None
+    best_params, best_metrics, stats = successive_halving_search(
+        X_train, y_train, folds, total_cores=n_jobs, matrices=matrices, **search_kwargs)
+    n_estimators = best_metrics["best_iteration"] + 1
+    if matrices is not None:
+        model = fit_cached(matrices, best_params, n_estimators, n_jobs)
+        matrices.close()
+    else:
+        model = make_model(best_params, n_estimators, n_jobs=n_jobs)
+        model.fit(X_train, y_train)
+    stats = dict(stats, val_rmse=best_metrics["rmse"], train_seconds=time.perf_counter() - start)
+    return group, model, dict(best_params, n_estimators=n_estimators), stats
+
+
+def train_groups(tasks, search_kwargs, total_cores=None, max_workers=None, cache_matrices=False):
+    """Run train_group for every (group, X_train, y_train, folds) task, one process per group at a time.
+
+    The cores are split between processes and the XGBoost threads of each with plan_cores, so the
+    wall time shrinks with the number of cores until there is one process per group.
+    """
+    workers, threads = plan_cores(len(tasks), total_cores, max_workers)
+    logging.info(f"Training {len(tasks)} group models on {workers} processes x {threads} threads")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(train_group, *task, search_kwargs, threads, cache_matrices) for task in tasks]
+        return [future.result() for future in futures]
+
+
+class RegionRouter:
+    """Predicts every row with the model of its region's group, loading each model on first use.
+
+    Rows of regions without a model get NaN. `load_fn(group)` returns the XGBRegressor of a group.
+    """
+
+    def __init__(self, groups, region_categories, features, load_fn, models=None):
+        self.groups = groups
+        self.region_categories = list(region_categories)
+        self.features = list(features)
+        self.group_names = sorted(set(groups.values()))
+        self._load_fn = load_fn
+        self._models = dict(models or {})
+        self._lock = threading.Lock()
+        position = {name: i for i, name in enumerate(self.group_names)}
+        # Region category code -> position of its group, -1 when it has none.
+        self._code_group = np.array([position.get(groups.get(region), -1) for region in self.region_categories])
+
+    def model(self, group):
+        with self._lock:
+            if group not in self._models:
+                self._models[group] = self._load_fn(group)
+            return self._models[group]
+
+    def _route(self, codes, predict):
+        codes = np.asarray(codes, dtype=np.int64)
+        known = (codes >= 0) & (codes < len(self._code_group))
+        group_pos = np.full(len(codes), -1)
+        group_pos[known] = self._code_group[codes[known]]
+        out = np.full(len(codes), np.nan, dtype=np.float32)
+        for pos in np.unique(group_pos[group_pos >= 0]):
+            rows = np.flatnonzero(group_pos == pos)
+            out[rows] = predict(self.model(self.group_names[pos]), rows)
+        return out
+
+    def predict(self, X):
+        """Predict a frame whose Region is the categorical the models were trained with."""
+        return self._route(X["Region"].cat.codes.to_numpy(), lambda model, rows: model.predict(X.iloc[rows]))
+
+    def predict_array(self, X):
+        """Predict a float array whose Region column holds the category code (the serving layout)."""
+        codes = np.nan_to_num(X[:, self.features.index("Region")], nan=-1)
+        return self._route(codes, lambda model, rows: model.get_booster().inplace_predict(X[rows]))
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+from utils.preprocess_utils import compute_weather_scores, WEATHER_INPUTS
+
+DISTRIBUTIONS = {
+    "constant": lambda rng, n, value: np.full(n, float(value)),
+    "normal": lambda rng, n, mean, std: rng.normal(mean, std, n),
+    "uniform": lambda rng, n, low, high: rng.uniform(low, high, n),
+    "triangular": lambda rng, n, low, mode, high: rng.triangular(low, mode, high, n),
+    "lognormal": lambda rng, n, mean, sigma: rng.lognormal(mean, sigma, n),
+}
+
+# Physical ranges perturbed inputs are clipped back into (days are per 30-day month).
+BOUNDS = {
+    "rainy_day": (0, 30), "snowy_day": (0, 30), "snowfall_sum": (0, None), "rain_sum": (0, None),
+    "cloud_cover_mean": (0, 100), "wind_speed_10m_max": (0, None), "mobility_index": (0, 1),
+}
+
+
+def sample_perturbations(spec, n, rng):
+    """Draw `n` values for every perturbed input.
+
+    `spec` maps an input to {"op": "add" | "mul", "dist": name, "args": [...]}, e.g. 3 °C warmer and
+    double snowfall: {"temperature_2m_mean": {"op": "add", "dist": "normal", "args": [3, 0.5]},
+                      "snowfall_sum": {"op": "mul", "dist": "constant", "args": [2]}}.
+    """
+    samples = {}
+    for column, entry in spec.items():
+        op = entry.get("op", "add")
+        if op not in ("add", "mul"):
+            raise ValueError(f"Unknown op '{op}' for {column}, expected 'add' or 'mul'")
+        dist = DISTRIBUTIONS.get(entry["dist"])
+        if dist is None:
+            raise ValueError(f"Unknown distribution '{entry['dist']}', expected one of {sorted(DISTRIBUTIONS)}")
+        samples[column] = (op, dist(rng, n, *entry.get("args", [])))
+    return samples
+
+
+def scenario_batch(base, features, samples, scaling_params, region_codes, n=None):
+    """Feature matrix of every region x scenario: base rows (one per region) with the sampled perturbations.
+
+    Row r * n + i is region r under scenario i; the same draws are used for every region, so regions
+    are compared under identical weather. `n` defaults to the number of draws (1 without samples).
+    """
+    n_regions = len(base)
+    n = n or (len(next(iter(samples.values()))[1]) if samples else 1)
+    columns = {}
+    for col in set(features) | set(WEATHER_INPUTS) | set(samples):
+        if col == "Region" or col not in base:
+            continue
+        values = np.repeat(base[col].to_numpy(np.float64), n)
+        if col in samples:
+            op, draws = samples[col]
+            draws = np.tile(draws, n_regions)
+            values = values + draws if op == "add" else values * draws
+            low, high = BOUNDS.get(col, (None, None))
+            if low is not None or high is not None:
+                values = np.clip(values, low, high)
+        columns[col] = values
+
+    if "weather_score" in features and set(samples) & set(WEATHER_INPUTS) and "weather_score" not in samples:
+        columns["weather_score"] = compute_weather_scores(columns, scaling_params)
+    columns["Region"] = np.repeat(region_codes, n).astype(np.float64)
+    return np.column_stack([columns.get(col, np.full(n_regions * n, np.nan)) for col in features]).astype(np.float32)
+
+
+def run_scenarios(predict_fn, base, features, region_categories, scaling_params, spec, n_samples=10000,
+                  batch_regions=None, percentiles=(5, 25, 50, 75, 95), seed=42):
+    """Monte Carlo percentile bands of tourism_index per region under the perturbations in `spec`.
+
+    `base` has one row per region with every feature and weather input (e.g. a region_month_profile
+    for the target month, with Month_Num). Regions are scored `batch_regions` at a time, so memory
+    stays at batch_regions x n_samples rows whatever the number of regions.
+    """
+    unknown = set(spec) - set(base.columns)
+    if unknown:
+        raise ValueError(f"Cannot perturb {sorted(unknown)}: not among the scenario inputs")
+    rng = np.random.default_rng(seed)
+    samples = sample_perturbations(spec, n_samples, rng)
+    codes = {region: code for code, region in enumerate(region_categories)}
+    base = base[base["Region"].isin(list(codes))].reset_index(drop=True)
+    if "weather_score" in features and set(spec) & set(WEATHER_INPUTS):
+        # Score the baseline from the same averaged inputs the scenarios perturb, so no perturbation is no shift.
+        base = base.assign(weather_score=compute_weather_scores(base, scaling_params))
+    batch_regions = batch_regions or max(1, 2_000_000 // n_samples)
+
+    baseline = np.clip(predict_fn(scenario_batch(
+        base, features, {}, scaling_params, base["Region"].map(codes).to_numpy())), 0, 1)
+    bands = []
+    for lo in range(0, len(base), batch_regions):
+        chunk = base.iloc[lo:lo + batch_regions]
+        X = scenario_batch(chunk, features, samples, scaling_params, chunk["Region"].map(codes).to_numpy(), n_samples)
+        scores = np.clip(predict_fn(X), 0, 1).reshape(len(chunk), n_samples)
+        below = (scores < baseline[lo:lo + len(chunk), None]).mean(axis=1)
+        bands.append(np.column_stack([np.percentile(scores, percentiles, axis=1).T, scores.mean(axis=1), below]))
+
+    result = pd.DataFrame(
+        np.vstack(bands) if bands else np.empty((0, len(percentiles) + 2)),
+        columns=[f"p{p}" for p in percentiles] + ["mean", "prob_below_baseline"],
+    )
+    result.insert(0, "Region", base["Region"].astype(str).to_numpy())
+    result.insert(1, "baseline", baseline)
+    result["mean_shift"] = result["mean"] - result["baseline"]
+    return result
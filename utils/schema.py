@@ -0,0 +1,65 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+# Compact dtype for every column the pipeline shares between stages.
+SCHEMA = {
+    # calendar
+    "Year": "int16", "year": "int16", "Month_Num": "int8", "month": "int8", "week": "int8",
+    # counts
+    "Italians": "int32", "Foreigners": "int32", "Total_presence": "int32",
+    "num_trips": "float32", "avg_daily_trips": "float32", "num_departures": "float32",
+    "rainy_day": "int8", "snowy_day": "int8", "n_days": "int8",
+    # weather
+    "temperature_2m_mean": "float32", "cloud_cover_mean": "float32", "rain_sum": "float32",
+    "snowfall_sum": "float32", "wind_speed_10m_max": "float32",
+    # indices
+    "mobility_index": "float32", "weather_score": "float32", "presence_index": "float32",
+    "tourism_index": "float32",
+    "tourism_index_mean": "float32", "tourism_index_min": "float32", "tourism_index_max": "float32",
+    "tourism_index_count": "int32",
+    # labels
+    "Region": "category", "tourism_region": "category", "Month_Name": "category",
+    "season": "category", "experience_level": "category",
+    "hour_band": "category",
+}
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+def _fits(series, dtype):
+    info = np.iinfo(dtype)
+    return series.min() >= info.min and series.max() <= info.max
+
+
+def optimize_dtypes(df, schema=SCHEMA, label=None):
+    """Cast the schema's columns of `df` in place to their compact dtype and return it.
+
+    Integer columns that hold NaN or values out of range fall back to float32 / stay as they are.
+    With a `label`, the memory footprint before and after is logged.
+    """
+    before = memory_mb(df) if label else None
+    for col in df.columns.intersection(list(schema)):
+        dtype = schema[col]
+        series = df[col]
+        if series.dtype == dtype:
+            continue
+        numeric = pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series)
+        if dtype.startswith("int"):
+            if not numeric:
+                continue
+            if series.isna().any():
+                df[col] = series.astype("float32")
+            elif _fits(series, dtype):
+                df[col] = series.astype(dtype)
+        elif dtype == "float32":
+            if numeric:
+                df[col] = series.astype(dtype)
+        else:
+            df[col] = series.astype(dtype)
+    if label:
+        logging.info(f"{label}: {before:.2f} MB -> {memory_mb(df):.2f} MB in memory ({len(df)} rows)")
+    return df
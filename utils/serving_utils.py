@@ -0,0 +1,107 @@
+import collections
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache."""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+def make_predict_fn(booster, compile_model=False, libpath="models/xgb_compiled.so"):
+    """Batch predict function for a 2-D float array, compiled with tl2cgen when asked and available."""
+    if compile_model:
+        try:
+            import treelite
+            import tl2cgen
+        except ImportError:
+            logging.warning("treelite/tl2cgen not installed, serving with the XGBoost booster")
+        else:
+            tl2cgen.export_lib(treelite.frontend.from_xgboost(booster), toolchain="gcc", libpath=libpath)
+            predictor = tl2cgen.Predictor(libpath)
+            logging.info(f"Serving with compiled model {libpath}")
+            return lambda X: np.asarray(predictor.predict(tl2cgen.DMatrix(X, dtype="float32"))).ravel()
+    return lambda X: booster.inplace_predict(X)
+
+
+def model_predict_fn(model, compile_model=False):
+    """Batch predict function of a loaded predictor: a RegionRouter routes rows itself."""
+    if hasattr(model, "predict_array"):
+        return model.predict_array
+    return make_predict_fn(model.get_booster(), compile_model)
+
+
+class PredictionError(RuntimeError):
+    """The predictor failed on a batch; raised to every request of that batch."""
+
+
+class MicroBatcher:
+    """Collects concurrent single-row requests and scores them with one predict call.
+
+    A batch is flushed once it holds `max_batch` rows or `max_wait` seconds after its first row.
+    """
+
+    def __init__(self, predict_fn, max_batch=256, max_wait=0.002):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, vector):
+        future = Future()
+        self._queue.put((vector, future))
+        return future
+
+    def predict(self, vector, timeout=5):
+        return self.submit(vector).result(timeout=timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+            except queue.Empty:
+                pass
+            vectors, futures = zip(*batch)
+            try:
+                predictions = self.predict_fn(np.vstack(vectors))
+            except Exception as e:
+                logging.exception(f"Prediction of a batch of {len(vectors)} rows failed")
+                # Wrapped so a ValueError or KeyError of the booster is not mistaken for a bad request.
+                error = PredictionError(f"{type(e).__name__}: {e}")
+                for future in futures:
+                    future.set_exception(error)
+                continue
+            for future, prediction in zip(futures, predictions):
+                future.set_result(float(prediction))
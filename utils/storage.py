@@ -0,0 +1,118 @@
+"""Artifact storage selected by URI: "s3://bucket" (or a bare bucket name) and "file:///root/dir".
+
+Keys are the same on both backends, so TOURISM_BUCKET=file:///srv/tourism runs the whole pipeline
+on local disk with the layout it has in S3. The local backend memory-maps the files it reads.
+"""
+import io
+import os
+import shutil
+
+import pandas as pd
+
+
+def is_columnar(key):
+    return key.endswith(".parquet")
+
+
+def read_frame(source, key, columns=None, memory_map=False):
+    """Read a CSV or (by the `.parquet` suffix of `key`) Parquet file, parsing only `columns`."""
+    if is_columnar(key):
+        # memory_map goes through to pyarrow, which maps the file instead of reading it into a buffer.
+        return pd.read_parquet(source, columns=columns, **({"memory_map": True} if memory_map else {}))
+    return pd.read_csv(source, usecols=columns, memory_map=memory_map)
+
+
+class S3Storage:
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.uri = f"s3://{bucket}"
+
+    def _client(self):
+        # boto3 is a large share of a cold start; only pay for it on the first S3 access.
+        import boto3
+        return boto3.client("s3")
+
+    def read_bytes(self, key):
+        return self._client().get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def write_bytes(self, key, data, content_type=None):
+        extra = {"ContentType": content_type} if content_type else {}
+        self._client().put_object(Bucket=self.bucket, Key=key, Body=data, **extra)
+
+    def read_frame(self, key, columns=None):
+        return read_frame(io.BytesIO(self.read_bytes(key)), key, columns)
+
+    def version(self, key):
+        """ETag of the object, a cheap version check that does not download the body."""
+        return self._client().head_object(Bucket=self.bucket, Key=key)["ETag"]
+
+    def download(self, key, path):
+        self._client().download_file(self.bucket, key, path)
+
+    def upload(self, path, key):
+        self._client().upload_file(path, self.bucket, key)
+
+
+class LocalStorage:
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.uri = f"file://{self.root}"
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def read_bytes(self, key):
+        with open(self.path(key), "rb") as f:
+            return f.read()
+
+    def write_bytes(self, key, data, content_type=None):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written next to the target and renamed over it, so readers never see half a file.
+        with open(path + ".tmp", "wb") as f:
+            f.write(data.encode("utf-8") if isinstance(data, str) else data)
+        os.replace(path + ".tmp", path)
+
+    def read_frame(self, key, columns=None):
+        return read_frame(self.path(key), key, columns, memory_map=True)
+
+    def version(self, key):
+        stat = os.stat(self.path(key))
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def download(self, key, path):
+        if os.path.abspath(path) != self.path(key):
+            shutil.copyfile(self.path(key), path)
+
+    def upload(self, path, key):
+        target = self.path(key)
+        if os.path.abspath(path) != target:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(path, target + ".tmp")
+            os.replace(target + ".tmp", target)
+
+
+def is_missing(error):
+    """Whether a storage error means the key does not exist (and not e.g. denied access or throttling)."""
+    if isinstance(error, FileNotFoundError):
+        return True
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code in ("404", "NoSuchKey", "NotFound")
+
+
+def get_storage(bucket):
+    """The backend of a bucket URI; a bare name is an S3 bucket, as TOURISM_BUCKET has always been."""
+    if bucket.startswith("file://"):
+        return LocalStorage(bucket[len("file://"):])
+    if bucket.startswith("s3://"):
+        return S3Storage(bucket[len("s3://"):].rstrip("/"))
+    return S3Storage(bucket)
+
+
+def resolve(uri):
+    """(storage, key) of a single artifact: "s3://bucket/key", "file:///dir/file" or a plain local path."""
+    if uri.startswith("s3://"):
+        bucket, _, key = uri[len("s3://"):].partition("/")
+        return S3Storage(bucket), key
+    path = os.path.abspath(uri[len("file://"):] if uri.startswith("file://") else uri)
+    return LocalStorage(os.path.dirname(path)), os.path.basename(path)
@@ -0,0 +1,135 @@
+"""Training data prepared once per data version and shared by every fit of a run.
+
+The training frame is cached on disk as Parquet under its data version (the S3 ETag of the source),
+so later runs on the same data skip the S3 read and CSV parse; only the latest version is kept.
+Each row subset the search fits on (a fold's train or validation rows, the refit's training split)
+becomes one QuantileDMatrix, whose quantile sketches and histogram cuts are computed once and
+reused by every trial and rung.
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from xgboost import XGBRegressor
+
+TRAIN_CACHE_DIR = os.getenv("TRAIN_CACHE_DIR", "data/train_cache")
+# TRAIN_EXTERNAL_MEMORY=1 streams each matrix from Parquet chunks and keeps XGBoost's pages on disk.
+TRAIN_EXTERNAL_MEMORY = os.getenv("TRAIN_EXTERNAL_MEMORY", "0") == "1"
+TRAIN_CHUNK_ROWS = int(os.getenv("TRAIN_CHUNK_ROWS", "1000000"))
+MAX_BIN = 256
+
+
+def cached_frame(source, version, build_fn, cache_dir=TRAIN_CACHE_DIR):
+    """The frame `build_fn()` returns for `version` of `source`, read from the on-disk cache after the first call.
+
+    Each source keeps only its latest version: writing a new one deletes the files of older versions.
+    """
+    source_dir = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", source))
+    path = os.path.join(source_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", version) + ".parquet")
+    if os.path.exists(path):
+        logging.info(f"Training data {source} {version} from cache {path}")
+        return pd.read_parquet(path)
+    df = build_fn()
+    os.makedirs(source_dir, exist_ok=True)
+    df.to_parquet(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+    for name in os.listdir(source_dir):
+        # Another run's .tmp is still being written and is left alone.
+        if name.endswith(".parquet") and os.path.join(source_dir, name) != path:
+            os.remove(os.path.join(source_dir, name))
+    logging.info(f"Cached training data {source} {version} to {path}")
+    return df
+
+
+def booster_params(params, n_jobs=-1, max_bin=MAX_BIN):
+    """make_model's settings in the form xgb.train takes."""
+    return dict(params, objective="reg:squarederror", tree_method="hist", seed=42, nthread=n_jobs, max_bin=max_bin)
+
+
+class ChunkIter(xgb.DataIter):
+    """Feeds XGBoost one Parquet chunk of features and label at a time."""
+
+    def __init__(self, paths, label, cache_prefix):
+        self._paths = paths
+        self._label = label
+        self._it = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._it == len(self._paths):
+            return False
+        chunk = pd.read_parquet(self._paths[self._it])
+        input_data(data=chunk.drop(columns=self._label), label=chunk[self._label])
+        self._it += 1
+        return True
+
+    def reset(self):
+        self._it = 0
+
+
+class MatrixCache:
+    """One QuantileDMatrix per row subset of (X, y), built on first use; validation matrices share
+    the cuts of their training matrix."""
+
+    def __init__(self, X, y, max_bin=MAX_BIN, external_memory=TRAIN_EXTERNAL_MEMORY,
+                 cache_dir=TRAIN_CACHE_DIR, chunk_rows=TRAIN_CHUNK_ROWS):
+        self.X = X
+        self.y = y
+        self.max_bin = max_bin
+        self.external_memory = external_memory
+        self.chunk_rows = chunk_rows
+        self.pages_dir = os.path.join(cache_dir, f"pages_{os.getpid()}_{id(self)}")
+        self._matrices = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def get(self, rows=None, ref=None):
+        key = "all" if rows is None else hashlib.sha1(np.asarray(rows, dtype=np.int64).tobytes()).hexdigest()
+        if ref is not None:
+            key += f"_ref{id(ref)}"
+        with self._lock:
+            if key not in self._matrices:
+                self._matrices[key] = self._build(key, rows, ref)
+                self.builds += 1
+            return self._matrices[key]
+
+    def fold(self, fold):
+        train_idx, val_idx = fold
+        dtrain = self.get(train_idx)
+        return dtrain, self.get(val_idx, ref=dtrain)
+
+    def _build(self, key, rows, ref):
+        X = self.X if rows is None else self.X.iloc[rows]
+        y = self.y if rows is None else self.y.iloc[rows]
+        if not self.external_memory:
+            return xgb.QuantileDMatrix(X, y, max_bin=self.max_bin, ref=ref, enable_categorical=True)
+
+        chunk_dir = os.path.join(self.pages_dir, key)
+        os.makedirs(chunk_dir, exist_ok=True)
+        paths = []
+        for i, lo in enumerate(range(0, len(X), self.chunk_rows)):
+            paths.append(os.path.join(chunk_dir, f"part_{i:05d}.parquet"))
+            X.iloc[lo:lo + self.chunk_rows].assign(_label=y.iloc[lo:lo + self.chunk_rows].to_numpy()).to_parquet(
+                paths[-1], index=False)
+        it = ChunkIter(paths, "_label", os.path.join(chunk_dir, "cache"))
+        if hasattr(xgb, "ExtMemQuantileDMatrix"):
+            return xgb.ExtMemQuantileDMatrix(it, max_bin=self.max_bin, ref=ref, enable_categorical=True)
+        return xgb.DMatrix(it, enable_categorical=True)
+
+    def close(self):
+        self._matrices.clear()
+        shutil.rmtree(self.pages_dir, ignore_errors=True)
+
+
+def fit_cached(matrices, params, n_estimators, n_jobs=-1):
+    """make_model(params, n_estimators).fit(X, y) on the cached full matrix, as an XGBRegressor."""
+    booster = xgb.train(booster_params(params, n_jobs, matrices.max_bin), matrices.get(), num_boost_round=n_estimators)
+    model = XGBRegressor(**params, n_estimators=n_estimators, enable_categorical=True, tree_method="hist")
+    model.load_model(bytearray(booster.save_raw("json")))
+    return model
@@ -0,0 +1,203 @@
+import logging
+import math
+import os
+import time
+
+import numpy as np
+import xgboost as xgb
+from joblib import Parallel, delayed
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import TimeSeriesSplit
+from xgboost import XGBRegressor
+
+from utils.train_matrix import booster_params
+
+# Continuous ranges are sampled uniformly (log-uniformly for "log"), lists are sampled as choices.
+PARAM_SPACE = {
+    "learning_rate": (0.003, 0.1, "log"),
+    "max_depth": [3, 4, 5, 6, 7],
+    "subsample": (0.6, 1.0),
+    "colsample_bytree": (0.6, 1.0),
+    "min_child_weight": [1, 3, 5],
+}
+
+
+def sample_params(space, rng):
+    params = {}
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            params[name] = spec[rng.integers(len(spec))]
+        elif len(spec) == 3 and spec[2] == "log":
+            params[name] = float(math.exp(rng.uniform(math.log(spec[0]), math.log(spec[1]))))
+        else:
+            params[name] = float(rng.uniform(spec[0], spec[1]))
+    return params
+
+
+def make_model(params, n_estimators, early_stopping_rounds=None, n_jobs=-1):
+    return XGBRegressor(
+        objective="reg:squarederror",
+        tree_method="hist",
+        enable_categorical=True,
+        random_state=42,
+        n_jobs=n_jobs,
+        n_estimators=n_estimators,
+        early_stopping_rounds=early_stopping_rounds,
+        **params,
+    )
+
+
+def fit_trial(params, X_train, y_train, X_val, y_val, n_estimators, early_stopping_rounds, n_jobs=-1):
+    """Fit one configuration with early stopping on the validation fold and score it."""
+    model = make_model(params, n_estimators, early_stopping_rounds, n_jobs)
+    model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+    y_pred = model.predict(X_val)
+    return model, {
+        "rmse": float(np.sqrt(mean_squared_error(y_val, y_pred))),
+        "r2": float(r2_score(y_val, y_pred)),
+        "best_iteration": int(model.best_iteration),
+    }
+
+
+def fit_trial_matrix(params, dtrain, dval, n_estimators, early_stopping_rounds, n_jobs=-1):
+    """fit_trial on prebuilt (Quantile)DMatrix objects, so no fit rebuilds the data or its cuts."""
+    booster = xgb.train(booster_params(params, n_jobs), dtrain, num_boost_round=n_estimators,
+                        evals=[(dval, "val")], early_stopping_rounds=early_stopping_rounds, verbose_eval=False)
+    y_val = dval.get_label()
+    y_pred = booster.predict(dval, iteration_range=(0, booster.best_iteration + 1))
+    return booster, {
+        "rmse": float(np.sqrt(mean_squared_error(y_val, y_pred))),
+        "r2": float(r2_score(y_val, y_pred)),
+        "best_iteration": int(booster.best_iteration),
+    }
+
+
+def holdout_fold(n_rows, validation_size):
+    """A single train/validation split expressed as row positions: the last `validation_size` of the
+    rows validate, so the rows must already be sorted by period for the split to be chronological."""
+    n_fit = int(round(n_rows * (1 - validation_size)))
+    positions = np.arange(n_rows)
+    return [(positions[:n_fit], positions[n_fit:])]
+
+
+def time_series_folds(periods, n_splits=3):
+    """Expanding-window folds over sorted periods, so a period never straddles train and validation.
+
+    `periods` holds one sortable period key per row (e.g. Year * 100 + Month_Num); returns a list of
+    (train_positions, val_positions) where each fold trains on every period before its validation block.
+    """
+    periods = np.asarray(periods)
+    unique = np.unique(periods)
+    folds = []
+    for train_periods, val_periods in TimeSeriesSplit(n_splits=n_splits).split(unique):
+        train_mask = np.isin(periods, unique[train_periods])
+        val_mask = np.isin(periods, unique[val_periods])
+        folds.append((np.flatnonzero(train_mask), np.flatnonzero(val_mask)))
+    return folds
+
+
+def plan_cores(n_tasks, total_cores=None, max_workers=None):
+    """Split the cores between parallel fits and XGBoost threads per fit without oversubscribing.
+
+    Returns (workers, threads_per_fit) with workers * threads_per_fit <= total_cores.
+    """
+    total = total_cores or os.cpu_count() or 1
+    workers = max(1, min(n_tasks, total, max_workers or total))
+    return workers, max(1, total // workers)
+
+
+def _cv_fit(params, X, y, fold, n_estimators, early_stopping_rounds, n_jobs, matrices=None):
+    if matrices is not None:
+        dtrain, dval = matrices.fold(fold)
+        _, metrics = fit_trial_matrix(params, dtrain, dval, n_estimators, early_stopping_rounds, n_jobs)
+        return metrics
+    train_idx, val_idx = fold
+    _, metrics = fit_trial(params, X.iloc[train_idx], y.iloc[train_idx], X.iloc[val_idx], y.iloc[val_idx],
+                           n_estimators, early_stopping_rounds, n_jobs)
+    return metrics
+
+
+def successive_halving_search(X, y, folds, space=PARAM_SPACE, n_trials=27, min_rounds=100, max_rounds=800,
+                              eta=3, early_stopping_rounds=50, time_budget=None, seed=42, log_trial=None,
+                              total_cores=None, max_workers=None, matrices=None):
+    """Successive halving over randomly sampled configurations, using boosting rounds as the resource.
+
+    Every rung fits the surviving configurations on each fold with `eta` times more rounds than the
+    previous one and keeps the best 1/eta by mean validation RMSE. Trial x fold fits of a rung run in
+    parallel threads with the cores split by `plan_cores`. `time_budget` is a soft limit: a rung is only
+    started when its cost, estimated from the previous rung, fits in the remaining seconds, but a
+    rung that runs longer than estimated is not interrupted. With `matrices` (a MatrixCache of X, y)
+    every fit reuses the fold's cached QuantileDMatrix. Returns (best_params, best_metrics, stats).
+    """
+    rng = np.random.default_rng(seed)
+    if matrices is not None:
+        # Build each fold's matrices once up front instead of inside the first rung's threads.
+        for fold in folds:
+            matrices.fold(fold)
+    candidates = [(trial, sample_params(space, rng)) for trial in range(n_trials)]
+    start = time.perf_counter()
+    rounds = min_rounds
+    rung = 0
+    n_fits = 0
+    n_evaluations = 0
+    best = None
+
+    while candidates:
+        rung_start = time.perf_counter()
+        tasks = [(trial, params, fold) for trial, params in candidates for fold in folds]
+        workers, threads = plan_cores(len(tasks), total_cores, max_workers)
+        fold_metrics = Parallel(n_jobs=workers, prefer="threads")(
+            delayed(_cv_fit)(params, X, y, fold, rounds, early_stopping_rounds, threads, matrices)
+            for _, params, fold in tasks
+        )
+        n_fits += len(tasks)
+        n_evaluations += len(candidates)
+
+        scored = []
+        for i, (trial, params) in enumerate(candidates):
+            per_fold = fold_metrics[i * len(folds):(i + 1) * len(folds)]
+            metrics = {
+                "rmse": float(np.mean([m["rmse"] for m in per_fold])),
+                "r2": float(np.mean([m["r2"] for m in per_fold])),
+                "best_iteration": int(np.mean([m["best_iteration"] for m in per_fold])),
+                "trial": trial, "rung": rung, "n_estimators": rounds, "n_folds": len(folds),
+            }
+            scored.append((metrics["rmse"], trial, params, metrics))
+            if log_trial is not None:
+                log_trial(params, metrics)
+        scored.sort(key=lambda item: item[0])
+        if best is None or scored[0][0] <= best[1]["rmse"]:
+            best = (scored[0][2], scored[0][3])
+
+        elapsed = time.perf_counter() - start
+        logging.info(f"Rung {rung}: {len(scored)} trials x {len(folds)} folds at {rounds} rounds on "
+                     f"{workers} workers x {threads} threads, best rmse {scored[0][0]:.5f} ({elapsed:.1f}s)")
+        if rounds >= max_rounds or len(scored) == 1:
+            break
+        keep = max(1, len(scored) // eta)
+        next_rounds = min(max_rounds, rounds * eta)
+        if time_budget is not None:
+            # Fits run in waves of `workers`; a rung costs about waves x rounds of the previous one.
+            next_workers, _ = plan_cores(keep * len(folds), total_cores, max_workers)
+            waves, next_waves = math.ceil(len(tasks) / workers), math.ceil(keep * len(folds) / next_workers)
+            estimate = (time.perf_counter() - rung_start) * (next_waves * next_rounds) / (waves * rounds)
+            if elapsed + estimate > time_budget:
+                logging.info(f"Search time budget of {time_budget}s: rung {rung + 1} would take about "
+                             f"{estimate:.0f}s after {elapsed:.0f}s, stopping after rung {rung}")
+                break
+        candidates = [(trial, params) for _, trial, params, _ in scored[:keep]]
+        rounds = next_rounds
+        rung += 1
+
+    elapsed = time.perf_counter() - start
+    minutes = max(elapsed, 1e-9) / 60
+    stats = {
+        "search_seconds": elapsed,
+        "trial_evaluations": n_evaluations,
+        "fits": n_fits,
+        "trials_per_minute": n_evaluations / minutes,
+        "fits_per_minute": n_fits / minutes,
+    }
+    logging.info(f"Search finished: {n_evaluations} trial evaluations ({n_fits} fits) in {elapsed:.1f}s, "
+                 f"{stats['trials_per_minute']:.1f} trials/min")
+    return best[0], best[1], stats
@@ -0,0 +1,54 @@
+import pandas as pd
+
+WEATHER_MEANS = ["temperature_2m_mean", "cloud_cover_mean", "rain_sum", "snowfall_sum", "wind_speed_10m_max"]
+WEEK_KEY = ["Region", "year", "week"]
+
+
+def add_iso_week(df, date_col="date"):
+    iso = df[date_col].dt.isocalendar()
+    df["year"] = iso["year"].astype("int32")
+    df["week"] = iso["week"].astype("int32")
+    df["week_start"] = df[date_col] - pd.to_timedelta(iso["day"].astype("int64") - 1, unit="D")
+    return df
+
+
+def weekly_weather(weather):
+    """Aggregate daily weather rows (Region, date, ...) to Region x ISO week in one groupby.
+
+    Continuous values are averaged like the monthly path does; rainy/snowy days are counted.
+    """
+    weather = weather.copy()
+    weather["rainy_day"] = weather["rain_sum"] > 0
+    weather["snowy_day"] = weather["snowfall_sum"] > 0
+    weather = add_iso_week(weather)
+    grouped = weather.groupby(WEEK_KEY + ["week_start"], sort=False, observed=True)
+    weekly = grouped[WEATHER_MEANS].mean()
+    weekly[["rainy_day", "snowy_day"]] = grouped[["rainy_day", "snowy_day"]].sum()
+    weekly["n_days"] = grouped.size()
+    return weekly.reset_index()
+
+
+def weekly_trips(daily_trips):
+    """Aggregate gtfs_etl's daily trip counts (tourism_region, date, num_trips) to Region x ISO week."""
+    trips = daily_trips.rename(columns={"tourism_region": "Region"})
+    trips = add_iso_week(trips)
+    weekly = (
+        trips.groupby(WEEK_KEY, sort=False, observed=True)["num_trips"]
+        .agg(num_trips="sum", avg_daily_trips="mean")
+        .reset_index()
+    )
+    return weekly
+
+
+def build_weekly_features(weather, daily_trips):
+    features = weekly_weather(weather).merge(weekly_trips(daily_trips), on=WEEK_KEY, how="left")
+    return features.sort_values(WEEK_KEY).reset_index(drop=True)
+
+
+def upsert_weeks(existing, fresh):
+    """Replace the weeks present in `fresh` and keep every older week of `existing`."""
+    if existing is None or existing.empty:
+        return fresh
+    combined = pd.concat([existing, fresh], ignore_index=True)
+    combined = combined.drop_duplicates(subset=WEEK_KEY, keep="last")
+    return combined.sort_values(WEEK_KEY).reset_index(drop=True)